@@ -8,6 +8,7 @@ from fastapi import APIRouter, HTTPException, Request, BackgroundTasks, Response
 from pydantic import BaseModel, EmailStr, Field
 from uuid import uuid4
 from app.core.email import send_email
+from app.core.rate_limit import auth_rate_limiter
 
 class AuthSchema(BaseModel):
     email: str
@@ -23,6 +24,10 @@ class UserOut(BaseModel):
     
 auth_router = APIRouter(prefix="/auth")
 
+signup_limiter = auth_rate_limiter("signup")
+signin_limiter = auth_rate_limiter("signin")
+password_reset_limiter = auth_rate_limiter("password_reset")
+
 async def send_verification_email(email: str, activation_token: str):
     # TODO: Use proper email template
     await send_email(
@@ -90,7 +95,13 @@ Ihor Savenko | Creda Security System
 
 
 @auth_router.post("/signup", response_model=UserOut)
-async def signup_event(payload: AuthSchema, background_tasks: BackgroundTasks) -> UserOut:
+async def signup_event(
+    payload: AuthSchema,
+    request: Request,
+    background_tasks: BackgroundTasks,
+) -> UserOut:
+    await signup_limiter.check(request, payload.email)
+
     if await User.find_one({"email": payload.email}):
         raise HTTPException(status_code=400, detail="Email already registered")
 
@@ -107,7 +118,7 @@ async def signup_event(payload: AuthSchema, background_tasks: BackgroundTasks) -
     otp_activation = OTPActivationModel(
         user_id=user.id,
         otp=otp_code,
-        expires_at=datetime.datetime.now() + datetime.timedelta(hours=1),
+        expires_at=datetime.datetime.utcnow() + datetime.timedelta(hours=1),
     )
 
     await otp_activation.insert()
@@ -159,7 +170,7 @@ async def activate_otp(otp_activation_token: str):
     if not otp_record:
         raise HTTPException(status_code=400, detail="Invalid OTP token")
 
-    if otp_record.expires_at < datetime.datetime.now():
+    if otp_record.expires_at < datetime.datetime.utcnow():
         await otp_record.delete()
         raise HTTPException(status_code=400, detail="OTP token expired")
 
@@ -180,9 +191,12 @@ async def activate_otp(otp_activation_token: str):
 @auth_router.post("/signin")
 async def signin_event(
     payload: AuthSchema,
+    request: Request,
     response: Response,
     background_tasks: BackgroundTasks,
 ):
+    await signin_limiter.check(request, payload.email)
+
     user = await User.find_one({"email": payload.email})
     if not user or not verify_password(payload.password, user.password):
         raise HTTPException(status_code=401, detail="Bad email or password")
@@ -231,8 +245,11 @@ class PasswordChangePayload(BaseModel):
 @auth_router.post("/password-reset/request")
 async def request_password_reset(
     payload: PasswordResetRequest,
+    request: Request,
     background_tasks: BackgroundTasks,
 ):
+    await password_reset_limiter.check(request, payload.email)
+
     user = await User.find_one({"email": payload.email})
     if not user:
         return {"ok": True}
@@ -2,8 +2,15 @@ from fastapi import APIRouter, Depends
 
 from app.core.jwt import FastJWT
 from api.private.profile import profile_router
+from api.private.audit import audit_router
+from api.private.batch import batch_router
+from api.private.cashflow import cashflow_router
 from api.private.income import income_router
 from api.private.invoice import invoice_router
+from api.private.line_items import line_items_router
+from api.private.recurring_invoice import recurring_invoice_router
+from api.private.reconciliation import reconciliation_router
+from api.private.search import search_router
 from api.private.identity import identity_router
 from api.private.workspace import workspace_router
 
@@ -12,5 +19,12 @@ private_router = APIRouter(prefix="/private", dependencies=[Depends(FastJWT().lo
 private_router.include_router(profile_router)
 private_router.include_router(income_router)
 private_router.include_router(invoice_router)
+private_router.include_router(recurring_invoice_router)
 private_router.include_router(identity_router)
 private_router.include_router(workspace_router)
+private_router.include_router(cashflow_router)
+private_router.include_router(reconciliation_router)
+private_router.include_router(audit_router)
+private_router.include_router(batch_router)
+private_router.include_router(search_router)
+private_router.include_router(line_items_router)
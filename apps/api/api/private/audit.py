@@ -0,0 +1,26 @@
+from beanie import PydanticObjectId
+from fastapi import APIRouter, Depends, Query
+
+from app.core.jwt import FastJWT
+from models.models import AuditEvent, User, Workspace
+from utils.get_current_workspace import get_current_workspace
+
+
+audit_router = APIRouter(prefix="/audit")
+
+
+@audit_router.get("/{entity_id}")
+async def entity_history(
+    entity_id: PydanticObjectId,
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Return the newest audit events recorded for ``entity_id``.
+
+    Events are written behind, so changes from the last
+    AUDIT_FLUSH_INTERVAL_SECONDS may not be listed yet.
+    """
+    return await AuditEvent.find(
+        {"workspace_id": workspace.id, "entity_id": entity_id}
+    ).sort("-ts").limit(limit).to_list()
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, Field
+
+from app.core.jwt import FastJWT
+from models.models import User
+from utils.get_current_workspace import get_current_workspace
+
+
+logger = logging.getLogger(__name__)
+
+batch_router = APIRouter(prefix="/batch")
+
+MAX_BATCH_REQUESTS = 20
+FORWARDED_HEADERS = {"if-none-match"}
+WORKSPACE_HEADER = "x-workspace-id"
+
+
+class BatchItem(BaseModel):
+    id: Optional[str] = None
+    method: Literal["GET", "POST", "PATCH", "PUT", "DELETE"] = "GET"
+    path: str = Field(description="Path relative to /private, e.g. /invoice/<id>?fields=number")
+    body: Optional[Any] = None
+    headers: Dict[str, str] = Field(default_factory=dict)
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem] = Field(min_length=1, max_length=MAX_BATCH_REQUESTS)
+
+
+def _item_workspace_id(item: BatchItem) -> Optional[str]:
+    for name, value in item.headers.items():
+        if name.lower() == WORKSPACE_HEADER:
+            return value
+    return None
+
+
+async def _resolve_workspace(request: Request, user: User, workspace_id: Optional[str]) -> dict:
+    """Resolve a workspace once for every sub-request that names it.
+
+    A failed resolution is handed over too, so sub-requests that need a
+    workspace fail with the same error instead of silently using another one.
+    """
+    try:
+        workspace = await get_current_workspace(
+            request,
+            user,
+            workspace_id or request.headers.get("X-Workspace-ID"),
+            request.cookies.get("X-Workspace-ID"),
+        )
+    except HTTPException as exc:
+        return {"batch_workspace_error": exc}
+    return {"batch_workspace": workspace}
+
+
+def _decode_body(content_type: str, body: bytes) -> Any:
+    if not body:
+        return None
+    if content_type.startswith("application/json"):
+        return json.loads(body)
+    return body.decode("utf-8", errors="replace")
+
+
+async def _dispatch(parent: Request, base_path: str, item: BatchItem, state: dict) -> dict:
+    """Run one sub-request through the ASGI app without leaving the process."""
+    path, _, query = item.path.partition("?")
+    full_path = f"{base_path}/{path.lstrip('/')}"
+    body = b"" if item.body is None else json.dumps(jsonable_encoder(item.body)).encode()
+
+    headers = [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in item.headers.items()
+        if name.lower() in FORWARDED_HEADERS
+    ]
+    headers += [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+
+    scope = {
+        "type": "http",
+        "asgi": parent.scope.get("asgi", {"version": "3.0"}),
+        "http_version": parent.scope.get("http_version", "1.1"),
+        "method": item.method,
+        "scheme": parent.url.scheme,
+        "server": parent.scope.get("server"),
+        "client": parent.scope.get("client"),
+        "root_path": parent.scope.get("root_path", ""),
+        "path": full_path,
+        "raw_path": full_path.encode(),
+        "query_string": query.encode(),
+        "headers": headers,
+        "state": {**parent.scope.get("state", {}), **state},
+    }
+
+    request_sent = False
+    response_done = asyncio.Event()
+    status_code = 500
+    response_headers: dict[str, str] = {}
+    chunks: list[bytes] = []
+
+    async def receive() -> dict:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            for name, value in message.get("headers", []):
+                response_headers[name.decode("latin-1")] = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_done.set()
+
+    try:
+        await parent.app(scope, receive, send)
+    except Exception:
+        logger.exception("Batch sub-request %s %s failed", item.method, full_path)
+        return {"id": item.id, "status": 500, "headers": {}, "body": {"detail": "Internal Server Error"}}
+    finally:
+        response_done.set()
+
+    response_headers.pop("content-length", None)
+    return {
+        "id": item.id,
+        "status": status_code,
+        "headers": response_headers,
+        "body": _decode_body(response_headers.get("content-type", ""), b"".join(chunks)),
+    }
+
+
+@batch_router.post("")
+async def run_batch(
+    payload: BatchRequest,
+    request: Request,
+    user: User = Depends(FastJWT().login_required),
+):
+    base_path = request.url.path.removesuffix("/batch")
+    for item in payload.requests:
+        if item.path.split("?", 1)[0].strip("/") == "batch":
+            raise HTTPException(status_code=400, detail="Batch requests cannot be nested")
+
+    # Authentication runs once and workspace resolution once per distinct
+    # X-Workspace-ID; both reach sub-requests through the ASGI scope state.
+    # Items without their own header use the batch request's workspace.
+    workspace_ids = list(dict.fromkeys(_item_workspace_id(item) for item in payload.requests))
+    resolved = await asyncio.gather(
+        *(_resolve_workspace(request, user, workspace_id) for workspace_id in workspace_ids)
+    )
+    workspace_state = dict(zip(workspace_ids, resolved))
+
+    responses = await asyncio.gather(
+        *(
+            _dispatch(
+                request,
+                base_path,
+                item,
+                {"batch_user": user, **workspace_state[_item_workspace_id(item)]},
+            )
+            for item in payload.requests
+        )
+    )
+    return {"responses": responses}
@@ -0,0 +1,234 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+from statistics import median
+
+from fastapi import APIRouter, Depends, Query
+
+from app.core.cache import workspace_cache
+from app.core.jwt import FastJWT
+from models.models import (
+    IncomeSourceType,
+    IncomeStatus,
+    IncomeTransaction,
+    Invoice,
+    InvoiceStatus,
+    User,
+    Workspace,
+    to_decimal,
+)
+from utils.get_current_workspace import get_current_workspace
+
+
+cashflow_router = APIRouter(prefix="/cashflow")
+
+projection_cache = workspace_cache(
+    "cashflow_projection",
+    ttl_seconds=900,
+    depends_on=("income_transactions", "invoices"),
+)
+
+PAYROLL_HISTORY_DAYS = 180
+
+
+async def _days_to_pay_by_person(workspace_id, currency: str) -> dict[str, float]:
+    pipeline = [
+        {
+            "$match": {
+                "workspace_id": workspace_id,
+                "status": InvoiceStatus.paid,
+                "currency": currency,
+            }
+        },
+        {
+            "$lookup": {
+                "from": IncomeTransaction.get_collection_name(),
+                "localField": "_id",
+                "foreignField": "invoice_id",
+                "pipeline": [
+                    {"$match": {"is_archived": False}},
+                    {"$sort": {"received_at": 1}},
+                    {"$limit": 1},
+                    {"$project": {"received_at": 1}},
+                ],
+                "as": "payment",
+            }
+        },
+        {"$unwind": "$payment"},
+        {
+            "$group": {
+                "_id": "$person_id",
+                "days_to_pay": {
+                    "$avg": {
+                        "$dateDiff": {
+                            "startDate": "$issue_date",
+                            "endDate": "$payment.received_at",
+                            "unit": "day",
+                        }
+                    }
+                },
+            }
+        },
+    ]
+    rows = await Invoice.aggregate(pipeline).to_list()
+    return {str(row["_id"]): max(row["days_to_pay"] or 0, 0) for row in rows}
+
+
+async def _payroll_history(workspace_id, currency: str, since: datetime) -> list[dict]:
+    pipeline = [
+        {
+            "$match": {
+                "workspace_id": workspace_id,
+                "source_type": IncomeSourceType.payroll,
+                "status": {"$ne": IncomeStatus.planned},
+                "currency": currency,
+                "is_archived": False,
+                "received_at": {"$gte": since},
+            }
+        },
+        {"$sort": {"received_at": 1}},
+        {
+            "$group": {
+                "_id": "$person_id",
+                "dates": {"$push": "$received_at"},
+                "amounts": {"$push": "$amount"},
+            }
+        },
+    ]
+    return await IncomeTransaction.aggregate(pipeline).to_list()
+
+
+def _project_payroll(history: list[dict], start: date, days: int) -> list[Decimal]:
+    """Repeat each payer's median pay interval and amount across the horizon."""
+    inflows = [Decimal(0)] * days
+    for row in history:
+        dates = [value.date() for value in row["dates"]]
+        if len(dates) < 2:
+            continue
+        intervals = [(later - earlier).days for earlier, later in zip(dates, dates[1:])]
+        interval = int(median(intervals))
+        if interval < 1:
+            continue
+        amount = median(to_decimal(value) for value in row["amounts"])
+        next_date = dates[-1] + timedelta(days=interval)
+        while next_date < start:
+            next_date += timedelta(days=interval)
+        offset = (next_date - start).days
+        for index in range(offset, days, interval):
+            inflows[index] += amount
+    return inflows
+
+
+async def _build_projection(
+    workspace_id,
+    currency: str,
+    days: int,
+    opening_balance: Decimal,
+    today: date,
+) -> dict:
+    start = datetime.combine(today, datetime.min.time())
+    end = start + timedelta(days=days)
+
+    planned = [Decimal(0)] * days
+    invoices = [Decimal(0)] * days
+
+    def add(series: list[Decimal], when: datetime, amount: Decimal) -> None:
+        index = max((when.date() - today).days, 0)
+        if index < days:
+            series[index] += amount
+
+    days_to_pay = await _days_to_pay_by_person(workspace_id, currency)
+    open_invoices = await Invoice.find(
+        {
+            "workspace_id": workspace_id,
+            "status": InvoiceStatus.issued,
+            "currency": currency,
+            "is_archived": False,
+        }
+    ).to_list()
+    for invoice in open_invoices:
+        expected_days = days_to_pay.get(str(invoice.person_id))
+        if expected_days is None:
+            expected_at = invoice.due_date
+        else:
+            expected_at = invoice.issue_date + timedelta(days=round(expected_days))
+        add(invoices, expected_at, invoice.total)
+
+    # Planned income tied to an open invoice is already counted above.
+    open_invoice_ids = {invoice.id for invoice in open_invoices}
+    planned_rows = await IncomeTransaction.find(
+        {
+            "workspace_id": workspace_id,
+            "status": IncomeStatus.planned,
+            "currency": currency,
+            "is_archived": False,
+            "received_at": {"$lt": end},
+        }
+    ).to_list()
+    for income in planned_rows:
+        if income.invoice_id in open_invoice_ids:
+            continue
+        add(planned, income.received_at, income.amount)
+
+    history = await _payroll_history(
+        workspace_id, currency, start - timedelta(days=PAYROLL_HISTORY_DAYS)
+    )
+    payroll = _project_payroll(history, today, days)
+
+    inflows = [sum(values) for values in zip(planned, invoices, payroll)]
+    balances = list(accumulate(inflows, initial=opening_balance))[1:]
+
+    daily = [
+        {
+            "date": today + timedelta(days=index),
+            "planned": planned[index],
+            "invoices": invoices[index],
+            "payroll": payroll[index],
+            "inflow": inflows[index],
+            "balance": balances[index],
+        }
+        for index in range(days)
+    ]
+
+    weekly: list[dict] = []
+    for point in daily:
+        week_start = point["date"] - timedelta(days=point["date"].weekday())
+        if not weekly or weekly[-1]["week_start"] != week_start:
+            weekly.append({"week_start": week_start, "inflow": Decimal(0), "balance": Decimal(0)})
+        weekly[-1]["inflow"] += point["inflow"]
+        weekly[-1]["balance"] = point["balance"]
+
+    return {
+        "currency": currency,
+        "opening_balance": opening_balance,
+        "days": days,
+        "totals": {
+            "planned": sum(planned),
+            "invoices": sum(invoices),
+            "payroll": sum(payroll),
+            "inflow": sum(inflows),
+        },
+        "daily": daily,
+        "weekly": weekly,
+    }
+
+
+@cashflow_router.get("/projection")
+async def cashflow_projection(
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+    currency: str = Query("GBP"),
+    days: int = Query(90, ge=1, le=366),
+    opening_balance: Decimal = Query(Decimal(0)),
+):
+    today = datetime.utcnow().date()
+    cache_key = (currency, days, opening_balance, today)
+    cached = projection_cache.get(workspace.id, cache_key)
+    if cached is not None:
+        return cached
+
+    projection = await _build_projection(
+        workspace.id, currency, days, opening_balance, today
+    )
+    projection_cache.set(workspace.id, cache_key, projection)
+    return projection
@@ -1,16 +1,31 @@
 from datetime import datetime
 from beanie import PydanticObjectId
-from fastapi import Depends, HTTPException, Header, Path, APIRouter, Query
+from fastapi import Depends, HTTPException, Header, Path, APIRouter, Query, Request, Response
 
+from app.core.archive import restore_from_cold
+from app.core.audit import audit_log, snapshot
+from app.core.cache import workspace_cache
 from app.core.jwt import FastJWT
+from app.core.search import index_document
+from app.core.versions import etag_matches, list_etag, workspace_data_changed
+from utils.batch import BatchGetRequest, batch_get
+from utils.fieldsets import document_fields, parse_fields, sparse_model
 from utils.get_current_workspace import get_current_workspace
-from models.models import Address, Person, User, Workspace
+from decimal import Decimal
+
+from models.models import Address, AuditAction, IncomeStatus, IncomeTransaction, Invoice, InvoiceStatus, Money, Person, User, Workspace
 
 
 identity_router = APIRouter(prefix="/identity")
 
+tags_cache = workspace_cache(
+    "person_tags",
+    ttl_seconds=600,
+    depends_on=("persons",),
+)
+
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 
 
@@ -58,6 +73,116 @@ class PersonExpanded(PersonListItem):
     note: Optional[str] = None
     created_at: datetime
 
+PERSON_FIELDS = document_fields(Person)
+PERSON_LIST_FIELDS = tuple(PersonExpanded.model_fields)
+
+class PersonStatsRequest(BaseModel):
+    person_ids: List[PydanticObjectId] = Field(min_length=1, max_length=100)
+
+
+class PersonCurrencyStats(BaseModel):
+    currency: str
+    lifetime_revenue: Money = Decimal(0)
+    payments_count: int = 0
+    outstanding_balance: Money = Decimal(0)
+    open_invoices_count: int = 0
+
+
+class PersonStats(BaseModel):
+    person_id: PydanticObjectId
+    last_payment_at: Optional[datetime] = None
+    currencies: List[PersonCurrencyStats] = []
+
+
+async def _person_stats(
+    workspace_id: PydanticObjectId,
+    person_ids: List[PydanticObjectId],
+) -> dict[str, PersonStats]:
+    pipeline = [
+        {
+            "$match": {
+                "workspace_id": workspace_id,
+                "person_id": {"$in": person_ids},
+                "is_archived": False,
+                "status": {"$ne": IncomeStatus.planned},
+            }
+        },
+        {
+            "$project": {
+                "person_id": 1,
+                "currency": 1,
+                "amount": 1,
+                "received_at": 1,
+                "kind": {"$literal": "income"},
+            }
+        },
+        {
+            "$unionWith": {
+                "coll": Invoice.get_collection_name(),
+                "pipeline": [
+                    {
+                        "$match": {
+                            "workspace_id": workspace_id,
+                            "person_id": {"$in": person_ids},
+                            "is_archived": False,
+                            "status": InvoiceStatus.issued,
+                        }
+                    },
+                    {
+                        "$project": {
+                            "person_id": 1,
+                            "currency": 1,
+                            "amount": "$total",
+                            "kind": {"$literal": "invoice"},
+                        }
+                    },
+                ],
+            }
+        },
+        {
+            "$group": {
+                "_id": {"person_id": "$person_id", "currency": "$currency"},
+                "lifetime_revenue": {
+                    "$sum": {"$cond": [{"$eq": ["$kind", "income"]}, "$amount", 0]}
+                },
+                "payments_count": {
+                    "$sum": {"$cond": [{"$eq": ["$kind", "income"]}, 1, 0]}
+                },
+                "outstanding_balance": {
+                    "$sum": {"$cond": [{"$eq": ["$kind", "invoice"]}, "$amount", 0]}
+                },
+                "open_invoices_count": {
+                    "$sum": {"$cond": [{"$eq": ["$kind", "invoice"]}, 1, 0]}
+                },
+                "last_payment_at": {"$max": "$received_at"},
+            }
+        },
+        {"$sort": {"_id.currency": 1}},
+    ]
+    rows = await IncomeTransaction.aggregate(pipeline).to_list()
+
+    stats = {str(person_id): PersonStats(person_id=person_id) for person_id in person_ids}
+    for row in rows:
+        entry = stats.get(str(row["_id"]["person_id"]))
+        if not entry:
+            continue
+        entry.currencies.append(
+            PersonCurrencyStats(
+                currency=row["_id"]["currency"],
+                lifetime_revenue=row["lifetime_revenue"],
+                payments_count=row["payments_count"],
+                outstanding_balance=row["outstanding_balance"],
+                open_invoices_count=row["open_invoices_count"],
+            )
+        )
+        last_payment_at = row.get("last_payment_at")
+        if last_payment_at and (
+            not entry.last_payment_at or last_payment_at > entry.last_payment_at
+        ):
+            entry.last_payment_at = last_payment_at
+    return stats
+
+
 @identity_router.post("/")
 async def create_person(
     payload: PersonCreate,
@@ -69,11 +194,23 @@ async def create_person(
         **payload.model_dump(),
     )
     await person.insert()
+    await workspace_data_changed(Person.get_collection_name(), workspace.id)
+    await index_document(person)
+    audit_log.record(
+        workspace_id=workspace.id,
+        entity_type="person",
+        entity_id=person.id,
+        action=AuditAction.create,
+        actor_id=user.id,
+        after=snapshot(person),
+    )
     return person
 
 
 @identity_router.get("/")
 async def list_persons(
+    request: Request,
+    response: Response,
     user: User = Depends(FastJWT().login_required),
     workspace: Workspace = Depends(get_current_workspace),
 
@@ -87,7 +224,14 @@ async def list_persons(
         default=[],
         description="Extra fields to include (e.g. include=details)"
     ),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
 ):
+    fieldset = parse_fields(fields, PERSON_LIST_FIELDS)
+    etag = await list_etag(request, workspace.id, Person.get_collection_name())
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
     query = Person.find(Person.workspace_id == workspace.id)
 
     archived_value = archived.lower() if archived else None
@@ -109,6 +253,9 @@ async def list_persons(
     if tag:
         query = query.find(Person.expense_tags == tag)
 
+    if fieldset:
+        return await query.project(sparse_model(Person, fieldset)).to_list()
+
     persons = await query.to_list()
 
     # 🔒 default response
@@ -144,17 +291,79 @@ async def list_persons(
         for p in persons
     ]
 
+@identity_router.get("/tags")
+async def person_tags(
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+    prefix: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+):
+    tags = tags_cache.get(workspace.id, "all")
+    if tags is None:
+        values = await Person.distinct(
+            "expense_tags", {"workspace_id": workspace.id, "is_archived": False}
+        )
+        tags = sorted({value for value in values if value}, key=str.lower)
+        tags_cache.set(workspace.id, "all", tags)
+
+    if prefix:
+        needle = prefix.lower()
+        tags = [tag for tag in tags if tag.lower().startswith(needle)]
+    return tags[:limit]
+
+
+@identity_router.post("/batch")
+async def batch_get_persons(
+    payload: BatchGetRequest,
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+):
+    return await batch_get(Person, workspace.id, payload, PERSON_FIELDS)
+
+
+@identity_router.post("/stats", response_model=List[PersonStats])
+async def batch_person_stats(
+    payload: PersonStatsRequest,
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+):
+    person_ids = list(dict.fromkeys(payload.person_ids))
+    stats = await _person_stats(workspace.id, person_ids)
+    return list(stats.values())
+
+
+@identity_router.get("/{person_id}/stats", response_model=PersonStats)
+async def get_person_stats(
+    person_id: PydanticObjectId,
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+):
+    person = await Person.find_one(
+        Person.id == person_id,
+        Person.workspace_id == workspace.id,
+    )
+
+    if not person:
+        raise HTTPException(status_code=404, detail="Person not found")
+
+    stats = await _person_stats(workspace.id, [person_id])
+    return stats[str(person_id)]
+
+
 @identity_router.get("/{person_id}")
 async def get_person(
     person_id: PydanticObjectId,
     user: User = Depends(FastJWT().login_required),
     workspace: Workspace = Depends(get_current_workspace),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
 ):
-    person = await Person.find_one(
+    fieldset = parse_fields(fields, PERSON_FIELDS)
+    query = Person.find_one(
         Person.id == person_id,
         Person.workspace_id == workspace.id,
         Person.is_archived == False,
     )
+    person = await (query.project(sparse_model(Person, fieldset)) if fieldset else query)
 
     if not person:
         raise HTTPException(status_code=404, detail="Person not found")
@@ -177,12 +386,25 @@ async def update_person(
     if not person:
         raise HTTPException(status_code=404, detail="Person not found")
 
+    before = snapshot(person)
+
     update_data = payload.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(person, field, value)
 
     person.updated_at = datetime.utcnow()
     await person.save()
+    await workspace_data_changed(Person.get_collection_name(), workspace.id)
+    await index_document(person)
+    audit_log.record(
+        workspace_id=workspace.id,
+        entity_type="person",
+        entity_id=person.id,
+        action=AuditAction.update,
+        actor_id=user.id,
+        before=before,
+        after=snapshot(person),
+    )
 
     return person
 
@@ -201,9 +423,23 @@ async def archive_person(
     if not person:
         raise HTTPException(status_code=404, detail="Person not found")
 
+    before = snapshot(person)
+
     person.is_archived = True
+    person.archived_at = datetime.utcnow()
     person.updated_at = datetime.utcnow()
     await person.save()
+    await workspace_data_changed(Person.get_collection_name(), workspace.id)
+    await index_document(person)
+    audit_log.record(
+        workspace_id=workspace.id,
+        entity_type="person",
+        entity_id=person.id,
+        action=AuditAction.archive,
+        actor_id=user.id,
+        before=before,
+        after=snapshot(person),
+    )
 
     return {"ok": True}
 
@@ -219,11 +455,33 @@ async def reactivate_person(
         Person.workspace_id == workspace.id,
     )
 
+    if not person and await restore_from_cold(
+        Person, {"_id": person_id, "workspace_id": workspace.id}
+    ):
+        person = await Person.find_one(
+            Person.id == person_id,
+            Person.workspace_id == workspace.id,
+        )
+
     if not person:
         raise HTTPException(status_code=404, detail="Person not found")
 
+    before = snapshot(person)
+
     person.is_archived = False
+    person.archived_at = None
     person.updated_at = datetime.utcnow()
     await person.save()
+    await workspace_data_changed(Person.get_collection_name(), workspace.id)
+    await index_document(person)
+    audit_log.record(
+        workspace_id=workspace.id,
+        entity_type="person",
+        entity_id=person.id,
+        action=AuditAction.reactivate,
+        actor_id=user.id,
+        before=before,
+        after=snapshot(person),
+    )
 
     return person
@@ -1,21 +1,40 @@
 from datetime import datetime, timedelta, timezone
 from typing import List, Optional, Literal
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from beanie import PydanticObjectId
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel, Field
 
+from app.core.audit import audit_log, snapshot
+from app.core.cache import workspace_cache
 from app.core.jwt import FastJWT
-from models.models import IncomeSourceType, IncomeStatus, IncomeTransaction, Person, User, Workspace, Invoice
+from app.core.metrics import record_income
+from app.core.search import index_document, index_documents
+from app.core.versions import etag_matches, list_etag, workspace_data_changed
+from models.models import AuditAction, IncomeSourceType, IncomeStatus, IncomeTransaction, Money, Person, User, Workspace, Invoice, to_decimal
+from utils.batch import BatchGetRequest, batch_get
+from utils.fieldsets import document_fields, parse_fields, sparse_model
 from utils.get_current_workspace import get_current_workspace
 
 
 income_router = APIRouter(prefix="/income")
 
+timeseries_cache = workspace_cache(
+    "income_timeseries",
+    ttl_seconds=300,
+    depends_on=("income_transactions",),
+)
+tags_cache = workspace_cache(
+    "income_tags",
+    ttl_seconds=600,
+    depends_on=("income_transactions",),
+)
+
 
 class IncomeCreate(BaseModel):
     person_id: PydanticObjectId
-    amount: float
+    amount: Money
     currency: str = "GBP"
     source_type: IncomeSourceType
     reference: Optional[str] = None
@@ -27,6 +46,10 @@ class IncomeCreate(BaseModel):
     invoice_id: Optional[PydanticObjectId] = None
 
 
+class IncomeImport(BaseModel):
+    items: List[IncomeCreate] = Field(min_length=1, max_length=1000)
+
+
 class IncomeUpdate(BaseModel):
     reference: Optional[str] = None
     received_at: Optional[datetime] = None
@@ -40,7 +63,7 @@ class IncomeListItem(BaseModel):
     id: PydanticObjectId
     person_id: PydanticObjectId
     invoice_id: Optional[PydanticObjectId] = None
-    amount: float
+    amount: Money
     currency: str
     source_type: IncomeSourceType
     reference: Optional[str] = None
@@ -49,6 +72,10 @@ class IncomeListItem(BaseModel):
     is_reconciled: bool
 
 
+INCOME_FIELDS = document_fields(IncomeTransaction, exclude={"fingerprint"})
+INCOME_LIST_FIELDS = tuple(IncomeListItem.model_fields)
+
+
 def _validate_received_at(received_at: datetime, status: IncomeStatus) -> None:
     if status == IncomeStatus.planned:
         return
@@ -78,11 +105,30 @@ def _apply_status_filter(query, status: str):
     )
 
 
+DuplicateMode = Literal["warn", "reject", "allow"]
+
+
+async def _find_duplicates(
+    workspace_id: PydanticObjectId,
+    fingerprints: List[str],
+) -> dict[str, PydanticObjectId]:
+    existing = await IncomeTransaction.find(
+        {
+            "workspace_id": workspace_id,
+            "fingerprint": {"$in": fingerprints},
+            "is_archived": False,
+        }
+    ).to_list()
+    return {income.fingerprint: income.id for income in existing}
+
+
 @income_router.post("/")
 async def create_income(
     payload: IncomeCreate,
+    response: Response,
     user: User = Depends(FastJWT().login_required),
     workspace: Workspace = Depends(get_current_workspace),
+    on_duplicate: DuplicateMode = Query("warn"),
 ):
     if payload.amount <= 0:
         raise HTTPException(status_code=400, detail="amount must be greater than 0")
@@ -114,12 +160,157 @@ async def create_income(
         workspace_id=workspace.id,
         **payload.model_dump(),
     )
+
+    if on_duplicate != "allow":
+        fingerprint = income.compute_fingerprint()
+        duplicates = await _find_duplicates(workspace.id, [fingerprint])
+        if fingerprint in duplicates:
+            if on_duplicate == "reject":
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Possible duplicate of income {duplicates[fingerprint]}",
+                )
+            response.headers["X-Duplicate-Of"] = str(duplicates[fingerprint])
+
     await income.insert()
+    record_income([income])
+    await workspace_data_changed(IncomeTransaction.get_collection_name(), workspace.id)
+    await index_document(income)
+    audit_log.record(
+        workspace_id=workspace.id,
+        entity_type="income",
+        entity_id=income.id,
+        action=AuditAction.create,
+        actor_id=user.id,
+        after=snapshot(income),
+    )
     return income
 
 
+@income_router.post("/import")
+async def import_income(
+    payload: IncomeImport,
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+    on_duplicate: DuplicateMode = Query("warn"),
+):
+    person_ids = list({item.person_id for item in payload.items})
+    persons = await Person.find(
+        {"_id": {"$in": person_ids}, "workspace_id": workspace.id, "is_archived": False}
+    ).to_list()
+    known_person_ids = {person.id for person in persons}
+
+    invoice_ids = list({item.invoice_id for item in payload.items if item.invoice_id})
+    invoices = await Invoice.find(
+        {"_id": {"$in": invoice_ids}, "workspace_id": workspace.id, "is_archived": False}
+    ).to_list()
+    invoice_persons = {invoice.id: invoice.person_id for invoice in invoices}
+
+    errors = []
+    incomes: List[tuple[int, IncomeTransaction]] = []
+    for index, item in enumerate(payload.items):
+        if item.amount <= 0:
+            errors.append({"index": index, "detail": "amount must be greater than 0"})
+            continue
+        try:
+            _validate_received_at(item.received_at, item.status)
+        except HTTPException as exc:
+            errors.append({"index": index, "detail": exc.detail})
+            continue
+        if item.person_id not in known_person_ids:
+            errors.append({"index": index, "detail": "Person not found"})
+            continue
+        if item.invoice_id and invoice_persons.get(item.invoice_id) != item.person_id:
+            errors.append({"index": index, "detail": "Invoice not found"})
+            continue
+        income = IncomeTransaction(workspace_id=workspace.id, **item.model_dump())
+        income.fingerprint = income.compute_fingerprint()
+        incomes.append((index, income))
+
+    duplicates: List[dict] = []
+    if on_duplicate != "allow" and incomes:
+        existing = await _find_duplicates(
+            workspace.id, [income.fingerprint for _, income in incomes]
+        )
+        seen: dict[str, int] = {}
+        kept: List[tuple[int, IncomeTransaction]] = []
+        for index, income in incomes:
+            duplicate_of = existing.get(income.fingerprint)
+            if duplicate_of or income.fingerprint in seen:
+                duplicates.append(
+                    {
+                        "index": index,
+                        "duplicate_of": str(duplicate_of) if duplicate_of else None,
+                        "duplicate_of_index": seen.get(income.fingerprint),
+                    }
+                )
+                if on_duplicate == "reject":
+                    continue
+            seen.setdefault(income.fingerprint, index)
+            kept.append((index, income))
+        incomes = kept
+
+    if incomes:
+        documents = [income for _, income in incomes]
+        result = await IncomeTransaction.insert_many(documents)
+        for income, income_id in zip(documents, result.inserted_ids):
+            income.id = income_id
+        record_income(documents)
+        await index_documents(documents)
+        await workspace_data_changed(IncomeTransaction.get_collection_name(), workspace.id)
+        audit_log.record_created(documents, entity_type="income", actor_id=user.id)
+
+    return {
+        "created": len(incomes),
+        "duplicates": duplicates,
+        "errors": errors,
+    }
+
+
+@income_router.get("/duplicates")
+async def find_duplicate_income(
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+    limit: int = Query(100, ge=1, le=500),
+):
+    pipeline = [
+        {"$match": {"workspace_id": workspace.id, "is_archived": False}},
+        {
+            "$group": {
+                "_id": {
+                    "person_id": "$person_id",
+                    "amount": {"$round": ["$amount", 2]},
+                    "currency": {"$toUpper": "$currency"},
+                    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$received_at"}},
+                    "reference": {"$toLower": {"$trim": {"input": {"$ifNull": ["$reference", ""]}}}},
+                },
+                "income_ids": {"$push": "$_id"},
+                "count": {"$sum": 1},
+            }
+        },
+        {"$match": {"count": {"$gt": 1}}},
+        {"$sort": {"count": -1, "_id.day": -1}},
+        {"$limit": limit},
+    ]
+    clusters = await IncomeTransaction.aggregate(pipeline).to_list()
+    return [
+        {
+            "person_id": str(cluster["_id"]["person_id"]),
+            "amount": to_decimal(cluster["_id"]["amount"]),
+            "currency": cluster["_id"]["currency"],
+            "received_on": cluster["_id"]["day"],
+            "reference": cluster["_id"]["reference"] or None,
+            "income_ids": [str(income_id) for income_id in cluster["income_ids"]],
+            "count": cluster["count"],
+        }
+        for cluster in clusters
+    ]
+
+
 @income_router.get("/")
 async def list_income(
+    request: Request,
+    response: Response,
     user: User = Depends(FastJWT().login_required),
     workspace: Workspace = Depends(get_current_workspace),
     person_id: Optional[PydanticObjectId] = Query(None),
@@ -130,11 +321,20 @@ async def list_income(
     source_type: Optional[IncomeSourceType] = Query(None),
     is_reconciled: Optional[bool] = Query(None),
     status: Literal["received", "planned", "all"] = Query("all"),
+    tags: List[str] = Query(default=[]),
+    tag_mode: Literal["any", "all"] = Query("any"),
     page: int = Query(1, ge=1),
     page_size: int = Query(25, ge=1, le=100),
     sort_by: Literal["received_at", "amount", "created_at"] = Query("received_at"),
     sort_dir: Literal["asc", "desc"] = Query("desc"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
 ):
+    fieldset = parse_fields(fields, INCOME_LIST_FIELDS)
+    etag = await list_etag(request, workspace.id, IncomeTransaction.get_collection_name())
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
     query = IncomeTransaction.find(
         IncomeTransaction.workspace_id == workspace.id,
         IncomeTransaction.is_archived == False,
@@ -161,6 +361,9 @@ async def list_income(
     if is_reconciled is not None:
         query = query.find(IncomeTransaction.is_reconciled == is_reconciled)
 
+    if tags:
+        query = query.find({"tags": {"$all" if tag_mode == "all" else "$in": tags}})
+
     query = _apply_status_filter(query, status)
 
     sort_field = {
@@ -171,15 +374,12 @@ async def list_income(
     sort_direction = "" if sort_dir == "asc" else "-"
 
     total = await query.count()
-    incomes = (
-        await query.sort(f"{sort_direction}{sort_field}")
-        .skip((page - 1) * page_size)
-        .limit(page_size)
-        .to_list()
-    )
+    query = query.sort(f"{sort_direction}{sort_field}").skip((page - 1) * page_size).limit(page_size)
 
-    return {
-        "items": [
+    if fieldset:
+        items = await query.project(sparse_model(IncomeTransaction, fieldset)).to_list()
+    else:
+        items = [
             IncomeListItem(
                 id=income.id,
                 person_id=income.person_id,
@@ -192,8 +392,11 @@ async def list_income(
                 received_at=income.received_at,
                 is_reconciled=income.is_reconciled,
             )
-            for income in incomes
-        ],
+            for income in await query.to_list()
+        ]
+
+    return {
+        "items": items,
         "total": total,
         "page": page,
         "page_size": page_size,
@@ -201,19 +404,17 @@ async def list_income(
     }
 
 
-@income_router.get("/summary")
-async def income_summary(
-    user: User = Depends(FastJWT().login_required),
-    workspace: Workspace = Depends(get_current_workspace),
-    person_id: Optional[PydanticObjectId] = Query(None),
-    from_date: Optional[datetime] = Query(None),
-    to_date: Optional[datetime] = Query(None),
-    source_type: Optional[IncomeSourceType] = Query(None),
-    is_reconciled: Optional[bool] = Query(None),
-    status: Literal["received", "planned", "all"] = Query("received"),
+def _summary_query(
+    workspace_id: PydanticObjectId,
+    person_id: Optional[PydanticObjectId],
+    from_date: Optional[datetime],
+    to_date: Optional[datetime],
+    source_type: Optional[IncomeSourceType],
+    is_reconciled: Optional[bool],
+    status: str,
 ):
     query = IncomeTransaction.find(
-        IncomeTransaction.workspace_id == workspace.id,
+        IncomeTransaction.workspace_id == workspace_id,
         IncomeTransaction.is_archived == False,
     )
 
@@ -232,30 +433,211 @@ async def income_summary(
     if is_reconciled is not None:
         query = query.find(IncomeTransaction.is_reconciled == is_reconciled)
 
-    query = _apply_status_filter(query, status)
+    return _apply_status_filter(query, status)
 
-    incomes = await query.to_list()
-    total_amount = sum(income.amount for income in incomes)
-    reconciled_count = sum(1 for income in incomes if income.is_reconciled)
+
+@income_router.get("/summary")
+async def income_summary(
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+    person_id: Optional[PydanticObjectId] = Query(None),
+    from_date: Optional[datetime] = Query(None),
+    to_date: Optional[datetime] = Query(None),
+    source_type: Optional[IncomeSourceType] = Query(None),
+    is_reconciled: Optional[bool] = Query(None),
+    status: Literal["received", "planned", "all"] = Query("received"),
+):
+    query = _summary_query(
+        workspace.id, person_id, from_date, to_date, source_type, is_reconciled, status
+    )
+
+    rows = await query.aggregate(
+        [
+            {
+                "$group": {
+                    "_id": None,
+                    "count": {"$sum": 1},
+                    "total_amount": {"$sum": "$amount"},
+                    "reconciled_count": {"$sum": {"$cond": ["$is_reconciled", 1, 0]}},
+                }
+            }
+        ]
+    ).to_list()
+    summary = rows[0] if rows else {}
 
     return {
-        "count": len(incomes),
-        "total_amount": total_amount,
-        "reconciled_count": reconciled_count,
+        "count": summary.get("count", 0),
+        "total_amount": to_decimal(summary.get("total_amount", 0)),
+        "reconciled_count": summary.get("reconciled_count", 0),
     }
 
 
+@income_router.get("/timeseries")
+async def income_timeseries(
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+    granularity: Literal["day", "week", "month", "quarter", "year"] = Query("month"),
+    group_by: Optional[Literal["person", "source_type", "currency"]] = Query(None),
+    tz: str = Query("UTC"),
+    person_id: Optional[PydanticObjectId] = Query(None),
+    from_date: Optional[datetime] = Query(None),
+    to_date: Optional[datetime] = Query(None),
+    source_type: Optional[IncomeSourceType] = Query(None),
+    is_reconciled: Optional[bool] = Query(None),
+    status: Literal["received", "planned", "all"] = Query("received"),
+):
+    try:
+        ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid timezone")
+
+    cache_key = (
+        granularity,
+        group_by,
+        tz,
+        str(person_id) if person_id else None,
+        from_date.isoformat() if from_date else None,
+        to_date.isoformat() if to_date else None,
+        source_type,
+        is_reconciled,
+        status,
+    )
+    cached = timeseries_cache.get(workspace.id, cache_key)
+    if cached is not None:
+        return cached
+
+    group_field = {
+        "person": "$person_id",
+        "source_type": "$source_type",
+        "currency": "$currency",
+        None: None,
+    }[group_by]
+    pipeline = [
+        {
+            "$group": {
+                "_id": {
+                    "bucket": {
+                        "$dateTrunc": {
+                            "date": "$received_at",
+                            "unit": granularity,
+                            "timezone": tz,
+                            "startOfWeek": "monday",
+                        }
+                    },
+                    "group": group_field,
+                },
+                "total_amount": {"$sum": "$amount"},
+                "count": {"$sum": 1},
+            }
+        },
+        {"$sort": {"_id.bucket": 1, "_id.group": 1}},
+    ]
+    query = _summary_query(
+        workspace.id, person_id, from_date, to_date, source_type, is_reconciled, status
+    )
+    rows = await query.aggregate(pipeline).to_list()
+
+    result = {
+        "granularity": granularity,
+        "group_by": group_by,
+        "tz": tz,
+        "points": [
+            {
+                "bucket": row["_id"]["bucket"],
+                "group": str(row["_id"]["group"]) if row["_id"]["group"] is not None else None,
+                "total_amount": to_decimal(row["total_amount"]),
+                "count": row["count"],
+            }
+            for row in rows
+        ],
+    }
+    timeseries_cache.set(workspace.id, cache_key, result)
+    return result
+
+
+@income_router.get("/tags")
+async def income_tags(
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+    prefix: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+):
+    tags = tags_cache.get(workspace.id, "all")
+    if tags is None:
+        values = await IncomeTransaction.distinct(
+            "tags", {"workspace_id": workspace.id, "is_archived": False}
+        )
+        tags = sorted({value for value in values if value}, key=str.lower)
+        tags_cache.set(workspace.id, "all", tags)
+
+    if prefix:
+        needle = prefix.lower()
+        tags = [tag for tag in tags if tag.lower().startswith(needle)]
+    return tags[:limit]
+
+
+@income_router.get("/tags/breakdown")
+async def income_tag_breakdown(
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+    person_id: Optional[PydanticObjectId] = Query(None),
+    from_date: Optional[datetime] = Query(None),
+    to_date: Optional[datetime] = Query(None),
+    source_type: Optional[IncomeSourceType] = Query(None),
+    is_reconciled: Optional[bool] = Query(None),
+    status: Literal["received", "planned", "all"] = Query("received"),
+):
+    query = _summary_query(
+        workspace.id, person_id, from_date, to_date, source_type, is_reconciled, status
+    )
+    rows = await query.aggregate(
+        [
+            {"$unwind": "$tags"},
+            {
+                "$group": {
+                    "_id": {"tag": "$tags", "currency": "$currency"},
+                    "total_amount": {"$sum": "$amount"},
+                    "count": {"$sum": 1},
+                }
+            },
+            {"$sort": {"total_amount": -1, "_id.tag": 1}},
+        ]
+    ).to_list()
+
+    return [
+        {
+            "tag": row["_id"]["tag"],
+            "currency": row["_id"]["currency"],
+            "total_amount": to_decimal(row["total_amount"]),
+            "count": row["count"],
+        }
+        for row in rows
+    ]
+
+
+@income_router.post("/batch")
+async def batch_get_income(
+    payload: BatchGetRequest,
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+):
+    return await batch_get(IncomeTransaction, workspace.id, payload, INCOME_FIELDS)
+
+
 @income_router.get("/{income_id}")
 async def get_income(
     income_id: PydanticObjectId,
     user: User = Depends(FastJWT().login_required),
     workspace: Workspace = Depends(get_current_workspace),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
 ):
-    income = await IncomeTransaction.find_one(
+    fieldset = parse_fields(fields, INCOME_FIELDS)
+    query = IncomeTransaction.find_one(
         IncomeTransaction.id == income_id,
         IncomeTransaction.workspace_id == workspace.id,
         IncomeTransaction.is_archived == False,
     )
+    income = await (query.project(sparse_model(IncomeTransaction, fieldset)) if fieldset else query)
 
     if not income:
         raise HTTPException(status_code=404, detail="Income not found")
@@ -279,6 +661,8 @@ async def update_income(
     if not income:
         raise HTTPException(status_code=404, detail="Income not found")
 
+    before = snapshot(income)
+
     update_data = payload.model_dump(exclude_unset=True)
 
     if "received_at" in update_data and update_data["received_at"]:
@@ -293,6 +677,17 @@ async def update_income(
 
     income.updated_at = datetime.utcnow()
     await income.save()
+    await workspace_data_changed(IncomeTransaction.get_collection_name(), workspace.id)
+    await index_document(income)
+    audit_log.record(
+        workspace_id=workspace.id,
+        entity_type="income",
+        entity_id=income.id,
+        action=AuditAction.update,
+        actor_id=user.id,
+        before=before,
+        after=snapshot(income),
+    )
 
     return income
 
@@ -312,8 +707,22 @@ async def archive_income(
     if not income:
         raise HTTPException(status_code=404, detail="Income not found")
 
+    before = snapshot(income)
+
     income.is_archived = True
+    income.archived_at = datetime.utcnow()
     income.updated_at = datetime.utcnow()
     await income.save()
+    await workspace_data_changed(IncomeTransaction.get_collection_name(), workspace.id)
+    await index_document(income)
+    audit_log.record(
+        workspace_id=workspace.id,
+        entity_type="income",
+        entity_id=income.id,
+        action=AuditAction.archive,
+        actor_id=user.id,
+        before=before,
+        after=snapshot(income),
+    )
 
     return {"ok": True}
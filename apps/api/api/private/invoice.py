@@ -1,24 +1,42 @@
+import csv
+import io
 from datetime import datetime
+from decimal import Decimal
 from typing import List, Optional, Literal
 from uuid import uuid4
 
 from beanie import PydanticObjectId
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
+from pymongo import ReturnDocument
 
+from app.core.archive import cold_collection
+from app.core.audit import audit_log, snapshot
 from app.core.jwt import FastJWT
+from app.core.metrics import INVOICES_CREATED, INVOICES_PAID, record_income
+from app.core.line_item_catalog import record_line_item_usage
+from app.core.search import index_document
 from app.core.email import send_email
 from app.core.config import config
+from app.core.database import db
+from app.core.versions import etag_matches, list_etag, workspace_data_changed
 from models.models import (
+    AuditAction,
     IncomeSourceType,
     IncomeTransaction,
     Invoice,
     InvoiceLineItem,
     InvoiceStatus,
+    Money,
     Person,
     User,
     Workspace,
+    quantize_money,
+    to_decimal,
 )
+from utils.batch import BatchGetRequest, batch_get
+from utils.fieldsets import document_fields, parse_fields, sparse_model
 from utils.get_current_workspace import get_current_workspace
 
 
@@ -28,7 +46,7 @@ invoice_router = APIRouter(prefix="/invoice")
 class InvoiceItemPayload(BaseModel):
     description: str
     quantity: float
-    unit_price: float
+    unit_price: Money
 
 
 class InvoiceCreate(BaseModel):
@@ -62,20 +80,92 @@ class InvoiceListItem(BaseModel):
     person_id: str
     number: str
     status: InvoiceStatus
-    total: float
+    total: Money
     currency: str
     issue_date: datetime
     due_date: datetime
     is_public: bool
 
 
+INVOICE_FIELDS = document_fields(Invoice)
+INVOICE_LIST_FIELDS = tuple(InvoiceListItem.model_fields)
+
+AGING_BUCKETS = ["current", "days_1_30", "days_31_60", "days_61_90", "days_90_plus"]
+
+
+def _aging_pipeline(workspace_id: PydanticObjectId, as_of: datetime) -> list:
+    days_overdue = {
+        "$dateDiff": {"startDate": "$due_date", "endDate": as_of, "unit": "day"}
+    }
+    bucket = {
+        "$switch": {
+            "branches": [
+                {"case": {"$lte": ["$days_overdue", 0]}, "then": "current"},
+                {"case": {"$lte": ["$days_overdue", 30]}, "then": "days_1_30"},
+                {"case": {"$lte": ["$days_overdue", 60]}, "then": "days_31_60"},
+                {"case": {"$lte": ["$days_overdue", 90]}, "then": "days_61_90"},
+            ],
+            "default": "days_90_plus",
+        }
+    }
+    return [
+        {
+            "$match": {
+                "workspace_id": workspace_id,
+                "status": InvoiceStatus.issued,
+                "is_archived": False,
+            }
+        },
+        {"$project": {"person_id": 1, "currency": 1, "total": 1, "days_overdue": days_overdue}},
+        {"$addFields": {"bucket": bucket}},
+        {
+            "$group": {
+                "_id": {"person_id": "$person_id", "currency": "$currency"},
+                **{
+                    name: {"$sum": {"$cond": [{"$eq": ["$bucket", name]}, "$total", 0]}}
+                    for name in AGING_BUCKETS
+                },
+                "total": {"$sum": "$total"},
+                "invoices_count": {"$sum": 1},
+            }
+        },
+        {
+            "$lookup": {
+                "from": Person.get_collection_name(),
+                "localField": "_id.person_id",
+                "foreignField": "_id",
+                "pipeline": [{"$project": {"name": 1}}],
+                "as": "person",
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "person_id": {"$toString": "$_id.person_id"},
+                "person_name": {"$first": "$person.name"},
+                "currency": "$_id.currency",
+                **{name: 1 for name in AGING_BUCKETS},
+                "total": 1,
+                "invoices_count": 1,
+            }
+        },
+        {"$sort": {"total": -1, "person_name": 1}},
+    ]
+
+
+def _aging_row(row: dict) -> dict:
+    for name in [*AGING_BUCKETS, "total"]:
+        row[name] = to_decimal(row[name])
+    return row
+
+
 def _compute_totals(items: List[InvoiceItemPayload], tax_rate: float):
     line_items: List[InvoiceLineItem] = []
-    subtotal = 0.0
+    subtotal = Decimal(0)
     for item in items:
         if isinstance(item, dict):
             item = InvoiceItemPayload(**item)
-        line_total = item.quantity * item.unit_price
+        line_total = quantize_money(to_decimal(item.quantity) * to_decimal(item.unit_price))
         subtotal += line_total
         line_items.append(
             InvoiceLineItem(
@@ -85,7 +175,7 @@ def _compute_totals(items: List[InvoiceItemPayload], tax_rate: float):
                 total=line_total,
             )
         )
-    tax_amount = subtotal * (tax_rate / 100)
+    tax_amount = quantize_money(subtotal * to_decimal(tax_rate) / 100)
     total = subtotal + tax_amount
     return line_items, subtotal, tax_amount, total
 
@@ -101,9 +191,37 @@ def _as_payload_list(items: List[InvoiceLineItem]) -> List[InvoiceItemPayload]:
     ]
 
 
+invoice_counters = db["invoice_counters"]
+
+
+async def _allocate_invoice_numbers(workspace_id: PydanticObjectId, count: int) -> List[str]:
+    """Reserve ``count`` consecutive invoice numbers with a single counter update."""
+    counter = await invoice_counters.find_one_and_update(
+        {"_id": workspace_id},
+        {"$inc": {"seq": count}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if counter is None:
+        # First allocation for this workspace: continue from existing invoices.
+        existing = await Invoice.find({"workspace_id": workspace_id}).count()
+        existing += await cold_collection(Invoice).count_documents({"workspace_id": workspace_id})
+        await invoice_counters.update_one(
+            {"_id": workspace_id},
+            {"$setOnInsert": {"seq": existing}},
+            upsert=True,
+        )
+        counter = await invoice_counters.find_one_and_update(
+            {"_id": workspace_id},
+            {"$inc": {"seq": count}},
+            return_document=ReturnDocument.AFTER,
+        )
+    last = counter["seq"]
+    return [f"INV-{number:04d}" for number in range(last - count + 1, last + 1)]
+
+
 async def _next_invoice_number(workspace_id: PydanticObjectId) -> str:
-    count = await Invoice.find({"workspace_id": workspace_id}).count()
-    return f"INV-{count + 1:04d}"
+    numbers = await _allocate_invoice_numbers(workspace_id, 1)
+    return numbers[0]
 
 
 def _validate_dates(issue_date: datetime, due_date: datetime):
@@ -158,6 +276,18 @@ async def create_invoice(
         is_public=payload.is_public,
     )
     await invoice.insert()
+    INVOICES_CREATED.labels(source="manual").inc()
+    await workspace_data_changed(Invoice.get_collection_name(), workspace.id)
+    await index_document(invoice)
+    await record_line_item_usage(workspace.id, invoice.currency, invoice.items)
+    audit_log.record(
+        workspace_id=workspace.id,
+        entity_type="invoice",
+        entity_id=invoice.id,
+        action=AuditAction.create,
+        actor_id=user.id,
+        after=snapshot(invoice),
+    )
 
     if payload.send_email:
         if not person.email:
@@ -182,6 +312,8 @@ async def create_invoice(
 
 @invoice_router.get("/")
 async def list_invoices(
+    request: Request,
+    response: Response,
     user: User = Depends(FastJWT().login_required),
     workspace: Workspace = Depends(get_current_workspace),
     person_id: Optional[PydanticObjectId] = Query(None),
@@ -192,7 +324,14 @@ async def list_invoices(
     page_size: int = Query(25, ge=1, le=100),
     sort_by: Literal["issue_date", "due_date", "total", "created_at"] = Query("issue_date"),
     sort_dir: Literal["asc", "desc"] = Query("desc"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
 ):
+    fieldset = parse_fields(fields, INVOICE_LIST_FIELDS)
+    etag = await list_etag(request, workspace.id, Invoice.get_collection_name())
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
     query = Invoice.find({"workspace_id": workspace.id, "is_archived": False})
 
     if person_id:
@@ -216,15 +355,12 @@ async def list_invoices(
     sort_direction = "" if sort_dir == "asc" else "-"
 
     total = await query.count()
-    invoices = (
-        await query.sort(f"{sort_direction}{sort_field}")
-        .skip((page - 1) * page_size)
-        .limit(page_size)
-        .to_list()
-    )
+    query = query.sort(f"{sort_direction}{sort_field}").skip((page - 1) * page_size).limit(page_size)
 
-    return {
-        "items": [
+    if fieldset:
+        items = await query.project(sparse_model(Invoice, fieldset)).to_list()
+    else:
+        items = [
             InvoiceListItem(
                 id=str(invoice.id),
                 person_id=str(invoice.person_id),
@@ -236,8 +372,11 @@ async def list_invoices(
                 due_date=invoice.due_date,
                 is_public=invoice.is_public,
             )
-            for invoice in invoices
-        ],
+            for invoice in await query.to_list()
+        ]
+
+    return {
+        "items": items,
         "total": total,
         "page": page,
         "page_size": page_size,
@@ -245,15 +384,74 @@ async def list_invoices(
     }
 
 
+@invoice_router.get("/aging")
+async def invoice_aging_report(
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+    as_of: Optional[datetime] = Query(None),
+    format: Literal["json", "csv"] = Query("json"),
+):
+    as_of = as_of or datetime.utcnow()
+    pipeline = _aging_pipeline(workspace.id, as_of)
+    columns = ["person_id", "person_name", "currency", *AGING_BUCKETS, "total", "invoices_count"]
+
+    if format == "csv":
+        async def stream_rows():
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            async for row in Invoice.aggregate(pipeline):
+                writer.writerow(_aging_row(row))
+                if buffer.tell() > 64 * 1024:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+
+        return StreamingResponse(
+            stream_rows(),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="aging-report.csv"'},
+        )
+
+    rows = [_aging_row(row) for row in await Invoice.aggregate(pipeline).to_list()]
+    totals: dict[str, dict[str, Decimal]] = {}
+    for row in rows:
+        currency_totals = totals.setdefault(
+            row["currency"], {name: Decimal(0) for name in [*AGING_BUCKETS, "total"]}
+        )
+        for name in [*AGING_BUCKETS, "total"]:
+            currency_totals[name] += row[name]
+
+    return {
+        "as_of": as_of,
+        "buckets": AGING_BUCKETS,
+        "rows": rows,
+        "totals": totals,
+    }
+
+
+@invoice_router.post("/batch")
+async def batch_get_invoices(
+    payload: BatchGetRequest,
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+):
+    return await batch_get(Invoice, workspace.id, payload, INVOICE_FIELDS)
+
+
 @invoice_router.get("/{invoice_id}")
 async def get_invoice(
     invoice_id: PydanticObjectId,
     user: User = Depends(FastJWT().login_required),
     workspace: Workspace = Depends(get_current_workspace),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
 ):
-    invoice = await Invoice.find_one(
+    fieldset = parse_fields(fields, INVOICE_FIELDS)
+    query = Invoice.find_one(
         {"_id": invoice_id, "workspace_id": workspace.id, "is_archived": False}
     )
+    invoice = await (query.project(sparse_model(Invoice, fieldset)) if fieldset else query)
 
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
@@ -275,6 +473,9 @@ async def update_invoice(
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
 
+    before = snapshot(invoice)
+    previous_items = list(invoice.items)
+
     update_data = payload.model_dump(exclude_unset=True)
     previous_status = invoice.status
 
@@ -308,8 +509,22 @@ async def update_invoice(
 
     invoice.updated_at = datetime.utcnow()
     await invoice.save()
+    await workspace_data_changed(Invoice.get_collection_name(), workspace.id)
+    await index_document(invoice)
+    if "items" in update_data:
+        await record_line_item_usage(workspace.id, invoice.currency, invoice.items, previous_items)
+    audit_log.record(
+        workspace_id=workspace.id,
+        entity_type="invoice",
+        entity_id=invoice.id,
+        action=AuditAction.update,
+        actor_id=user.id,
+        before=before,
+        after=snapshot(invoice),
+    )
 
     if update_data.get("status") == InvoiceStatus.paid and previous_status != InvoiceStatus.paid:
+        INVOICES_PAID.labels(source="manual").inc()
         existing_income = await IncomeTransaction.find_one(
             {
                 "workspace_id": workspace.id,
@@ -330,6 +545,17 @@ async def update_invoice(
                 notes=f"Auto-generated from invoice {invoice.number}.",
             )
             await income.insert()
+            record_income([income])
+            await workspace_data_changed(IncomeTransaction.get_collection_name(), workspace.id)
+            await index_document(income)
+            audit_log.record(
+                workspace_id=workspace.id,
+                entity_type="income",
+                entity_id=income.id,
+                action=AuditAction.create,
+                actor_id=user.id,
+                after=snapshot(income),
+            )
 
     return invoice
 
@@ -347,9 +573,23 @@ async def archive_invoice(
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
 
+    before = snapshot(invoice)
+
     invoice.is_archived = True
+    invoice.archived_at = datetime.utcnow()
     invoice.updated_at = datetime.utcnow()
     await invoice.save()
+    await workspace_data_changed(Invoice.get_collection_name(), workspace.id)
+    await index_document(invoice)
+    audit_log.record(
+        workspace_id=workspace.id,
+        entity_type="invoice",
+        entity_id=invoice.id,
+        action=AuditAction.archive,
+        actor_id=user.id,
+        before=before,
+        after=snapshot(invoice),
+    )
 
     return {"ok": True}
 
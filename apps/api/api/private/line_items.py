@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, Query
+
+from app.core.jwt import FastJWT
+from app.core.line_item_catalog import autocomplete
+from models.models import User, Workspace
+from utils.get_current_workspace import get_current_workspace
+
+
+line_items_router = APIRouter(prefix="/line-items")
+
+
+@line_items_router.get("/autocomplete")
+async def line_item_autocomplete(
+    prefix: str = Query(..., min_length=1, max_length=80),
+    limit: int = Query(10, ge=1, le=20),
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+):
+    return await autocomplete(workspace.id, prefix, limit)
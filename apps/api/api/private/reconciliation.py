@@ -0,0 +1,441 @@
+import asyncio
+import csv
+import io
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+from beanie import PydanticObjectId
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from pymongo import UpdateOne
+
+from app.core.audit import audit_log
+from app.core.database import db
+from app.core.jwt import FastJWT
+from app.core.metrics import INVOICES_PAID, record_income
+from app.core.search import index_documents
+from app.core.versions import workspace_data_changed
+from models.models import (
+    AuditAction,
+    IncomeSourceType,
+    IncomeStatus,
+    IncomeTransaction,
+    Invoice,
+    InvoiceStatus,
+    User,
+    Workspace,
+    quantize_money,
+)
+from utils.get_current_workspace import get_current_workspace
+
+
+reconciliation_router = APIRouter(prefix="/reconciliation")
+
+MAX_STATEMENT_BYTES = 20 * 1024 * 1024
+DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y")
+DATE_COLUMNS = ("date", "booking_date", "transaction_date", "value_date")
+AMOUNT_COLUMNS = ("amount", "credit", "paid_in")
+REFERENCE_COLUMNS = ("reference", "ref", "description", "details", "memo")
+CURRENCY_COLUMNS = ("currency", "ccy")
+
+
+@dataclass
+class StatementLine:
+    line: int
+    date: datetime
+    amount_cents: int
+    currency: str
+    reference: str
+    keys: set[str] = field(default_factory=set)
+
+
+@dataclass
+class Candidate:
+    kind: str
+    id: PydanticObjectId
+    date: datetime
+    amount_cents: int
+    person_id: PydanticObjectId
+    currency: str
+    reference_key: Optional[str]
+    number: Optional[str] = None
+
+
+def _reference_key(value: Optional[str]) -> Optional[str]:
+    """Full reference with case and separators dropped: "inv-0001" -> "INV0001"."""
+    key = re.sub(r"[^A-Z0-9]", "", (value or "").upper())
+    return key if len(key) >= 3 else None
+
+
+def _line_keys(reference: str) -> set[str]:
+    """Keys a statement reference may contain: each word, each adjacent word
+    pair (for "INV 0001") and the whole reference."""
+    words = [key for key in (re.sub(r"[^A-Z0-9]", "", word.upper()) for word in reference.split()) if key]
+    keys = set(words)
+    keys.update(first + second for first, second in zip(words, words[1:]))
+    keys.add("".join(words))
+    return {key for key in keys if len(key) >= 3}
+
+
+def _to_cents(value) -> int:
+    return int(quantize_money(value).scaleb(2))
+
+
+def _from_cents(value: int) -> Decimal:
+    return Decimal(value).scaleb(-2)
+
+
+def _parse_amount(raw: str) -> Optional[int]:
+    cleaned = re.sub(r"[^0-9.\-]", "", raw.replace(",", ""))
+    if not cleaned or cleaned in {"-", "."}:
+        return None
+    try:
+        return _to_cents(Decimal(cleaned))
+    except InvalidOperation:
+        return None
+
+
+def _parse_date(raw: str) -> Optional[datetime]:
+    raw = raw.strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(raw, date_format)
+        except ValueError:
+            continue
+    return None
+
+
+def _pick_column(header: list[str], options: tuple[str, ...]) -> Optional[str]:
+    normalized = {name.strip().lower().replace(" ", "_"): name for name in header}
+    for option in options:
+        if option in normalized:
+            return normalized[option]
+    return None
+
+
+def _parse_statement(content: bytes, default_currency: str) -> list[StatementLine]:
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Statement must be UTF-8 encoded CSV")
+
+    reader = csv.DictReader(io.StringIO(text))
+    header = reader.fieldnames or []
+    date_column = _pick_column(header, DATE_COLUMNS)
+    amount_column = _pick_column(header, AMOUNT_COLUMNS)
+    currency_column = _pick_column(header, CURRENCY_COLUMNS)
+    if not date_column or not amount_column:
+        raise HTTPException(
+            status_code=400,
+            detail="Statement must have date and amount columns",
+        )
+    reference_columns = [
+        name
+        for name in header
+        if name.strip().lower().replace(" ", "_") in REFERENCE_COLUMNS
+    ]
+
+    lines: list[StatementLine] = []
+    for index, row in enumerate(reader, start=2):
+        date = _parse_date(row.get(date_column) or "")
+        amount_cents = _parse_amount(row.get(amount_column) or "")
+        if date is None or amount_cents is None or amount_cents <= 0:
+            continue
+        reference = " ".join((row.get(name) or "").strip() for name in reference_columns).strip()
+        currency = (row.get(currency_column) or "").strip() if currency_column else ""
+        lines.append(
+            StatementLine(
+                line=index,
+                date=date,
+                amount_cents=amount_cents,
+                currency=(currency or default_currency).upper(),
+                reference=reference,
+                keys=_line_keys(reference),
+            )
+        )
+    return lines
+
+
+class CandidateIndex:
+    """Hash of (currency, amount) -> candidates sorted by date, plus a hash of
+    full reference keys (invoice numbers, income references)."""
+
+    def __init__(self, candidates: list[Candidate]):
+        self.by_amount: dict[tuple[str, int], list[Candidate]] = defaultdict(list)
+        self.by_key: dict[str, list[Candidate]] = defaultdict(list)
+        for candidate in candidates:
+            self.by_amount[(candidate.currency, candidate.amount_cents)].append(candidate)
+            if candidate.reference_key:
+                self.by_key[candidate.reference_key].append(candidate)
+        self.dates: dict[tuple[str, int], list[datetime]] = {}
+        for key, items in self.by_amount.items():
+            items.sort(key=lambda candidate: candidate.date)
+            self.dates[key] = [candidate.date for candidate in items]
+
+    def same_amount(self, line: StatementLine) -> list[Candidate]:
+        return self.by_amount.get((line.currency, line.amount_cents), [])
+
+    def in_window(self, line: StatementLine, window: timedelta) -> list[Candidate]:
+        items = self.same_amount(line)
+        if not items:
+            return []
+        dates = self.dates[(line.currency, line.amount_cents)]
+        start = bisect_left(dates, line.date - window)
+        end = bisect_right(dates, line.date + window)
+        return items[start:end]
+
+    def by_reference(self, line: StatementLine) -> list[Candidate]:
+        matches: dict[PydanticObjectId, Candidate] = {}
+        for key in line.keys:
+            for candidate in self.by_key.get(key, []):
+                if candidate.amount_cents == line.amount_cents and candidate.currency == line.currency:
+                    matches[candidate.id] = candidate
+        return list(matches.values())
+
+
+def _serialize_candidate(candidate: Candidate) -> dict:
+    return {
+        "type": candidate.kind,
+        "id": str(candidate.id),
+        "person_id": str(candidate.person_id),
+        "date": candidate.date,
+        "amount": _from_cents(candidate.amount_cents),
+        "currency": candidate.currency,
+        "number": candidate.number,
+    }
+
+
+def _serialize_line(line: StatementLine) -> dict:
+    return {
+        "line": line.line,
+        "date": line.date,
+        "amount": _from_cents(line.amount_cents),
+        "currency": line.currency,
+        "reference": line.reference,
+    }
+
+
+def _match_lines(
+    lines: list[StatementLine],
+    income_candidates: list[Candidate],
+    invoice_candidates: list[Candidate],
+    window: timedelta,
+) -> tuple[list[tuple[StatementLine, Candidate]], list[dict], list[dict]]:
+    """Split statement lines into confident matches, ambiguous and unmatched lines."""
+    income_index = CandidateIndex(income_candidates)
+    # Invoices are paid any time after issue, so they match on reference or
+    # on an amount that is unique among open invoices rather than on a date.
+    invoice_index = CandidateIndex(invoice_candidates)
+
+    used: set[PydanticObjectId] = set()
+    confident: list[tuple[StatementLine, Candidate]] = []
+    ambiguous: list[dict] = []
+    unmatched: list[dict] = []
+
+    for line in sorted(lines, key=lambda item: item.date):
+        income_matches = [
+            candidate
+            for candidate in income_index.in_window(line, window)
+            if candidate.id not in used
+        ]
+        referenced = [
+            candidate
+            for candidate in income_index.by_reference(line) + invoice_index.by_reference(line)
+            if candidate.id not in used
+        ]
+        invoice_matches = [
+            candidate
+            for candidate in invoice_index.same_amount(line)
+            if candidate.id not in used
+        ]
+
+        match: Optional[Candidate] = None
+        if len(referenced) == 1:
+            match = referenced[0]
+        elif len(income_matches) == 1 and not referenced:
+            match = income_matches[0]
+        elif not income_matches and not referenced and len(invoice_matches) == 1:
+            match = invoice_matches[0]
+
+        if match:
+            used.add(match.id)
+            confident.append((line, match))
+            continue
+
+        options = referenced or income_matches or invoice_matches
+        if options:
+            ambiguous.append(
+                {
+                    **_serialize_line(line),
+                    "candidates": [_serialize_candidate(candidate) for candidate in options[:10]],
+                }
+            )
+        else:
+            unmatched.append(_serialize_line(line))
+
+    return confident, ambiguous, unmatched
+
+
+@reconciliation_router.post("/statement")
+async def reconcile_statement(
+    statement: UploadFile = File(...),
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+    date_window_days: int = Query(3, ge=0, le=60),
+    auto_reconcile: bool = Query(True),
+    currency: str = Query("GBP", min_length=3, max_length=3),
+):
+    """Match statement lines to income and open invoices of the same currency.
+
+    ``currency`` applies to lines when the statement has no currency column.
+    """
+    content = await statement.read(MAX_STATEMENT_BYTES + 1)
+    if len(content) > MAX_STATEMENT_BYTES:
+        raise HTTPException(status_code=413, detail="Statement file is too large")
+
+    lines = _parse_statement(content, currency)
+    if not lines:
+        return {"lines": 0, "applied": auto_reconcile, "reconciled": [], "ambiguous": [], "unmatched": []}
+
+    window = timedelta(days=date_window_days)
+    range_start = min(line.date for line in lines) - window
+    range_end = max(line.date for line in lines) + window + timedelta(days=1)
+
+    incomes = await IncomeTransaction.find(
+        {
+            "workspace_id": workspace.id,
+            "is_archived": False,
+            "is_reconciled": False,
+            "status": {"$ne": IncomeStatus.planned},
+            "received_at": {"$gte": range_start, "$lt": range_end},
+        }
+    ).to_list()
+    invoices = await Invoice.find(
+        {
+            "workspace_id": workspace.id,
+            "is_archived": False,
+            "status": InvoiceStatus.issued,
+        }
+    ).to_list()
+
+    income_candidates = [
+        Candidate(
+            kind="income",
+            id=income.id,
+            date=income.received_at.replace(tzinfo=None),
+            amount_cents=_to_cents(income.amount),
+            person_id=income.person_id,
+            currency=income.currency.upper(),
+            reference_key=_reference_key(income.reference),
+        )
+        for income in incomes
+    ]
+    invoice_candidates = [
+        Candidate(
+            kind="invoice",
+            id=invoice.id,
+            date=invoice.due_date.replace(tzinfo=None),
+            amount_cents=_to_cents(invoice.total),
+            person_id=invoice.person_id,
+            currency=invoice.currency.upper(),
+            reference_key=_reference_key(invoice.number),
+            number=invoice.number,
+        )
+        for invoice in invoices
+    ]
+    confident, ambiguous, unmatched = _match_lines(
+        lines, income_candidates, invoice_candidates, window
+    )
+
+    if auto_reconcile and confident:
+        now = datetime.utcnow()
+        income_updates = [
+            UpdateOne(
+                {"_id": candidate.id, "workspace_id": workspace.id, "is_reconciled": False},
+                {"$set": {"is_reconciled": True, "updated_at": now}},
+            )
+            for _, candidate in confident
+            if candidate.kind == "income"
+        ]
+        invoice_matches = [
+            (line, candidate) for line, candidate in confident if candidate.kind == "invoice"
+        ]
+        if income_updates:
+            await db[IncomeTransaction.get_collection_name()].bulk_write(income_updates, ordered=False)
+            for _, candidate in confident:
+                if candidate.kind == "income":
+                    audit_log.record(
+                        workspace_id=workspace.id,
+                        entity_type="income",
+                        entity_id=candidate.id,
+                        action=AuditAction.update,
+                        actor_id=user.id,
+                        before={"is_reconciled": False},
+                        after={"is_reconciled": True},
+                    )
+        new_incomes = []
+        if invoice_matches:
+            # One conditional update per invoice, so an invoice paid concurrently
+            # (by update_invoice or another reconcile) does not get a second income.
+            results = await asyncio.gather(
+                *(
+                    db[Invoice.get_collection_name()].update_one(
+                        {"_id": candidate.id, "workspace_id": workspace.id, "status": InvoiceStatus.issued},
+                        {"$set": {"status": InvoiceStatus.paid, "updated_at": now}},
+                    )
+                    for _, candidate in invoice_matches
+                )
+            )
+            new_incomes = [
+                IncomeTransaction(
+                    workspace_id=workspace.id,
+                    person_id=candidate.person_id,
+                    invoice_id=candidate.id,
+                    amount=_from_cents(candidate.amount_cents),
+                    currency=candidate.currency,
+                    source_type=IncomeSourceType.bank_transfer,
+                    reference=line.reference or candidate.number,
+                    received_at=line.date,
+                    notes=f"Reconciled from bank statement line {line.line}.",
+                    is_reconciled=True,
+                )
+                for (line, candidate), result in zip(invoice_matches, results)
+                if result.modified_count
+            ]
+            INVOICES_PAID.labels(source="reconciliation").inc(len(new_incomes))
+            for income in new_incomes:
+                audit_log.record(
+                    workspace_id=workspace.id,
+                    entity_type="invoice",
+                    entity_id=income.invoice_id,
+                    action=AuditAction.update,
+                    actor_id=user.id,
+                    before={"status": InvoiceStatus.issued.value},
+                    after={"status": InvoiceStatus.paid.value},
+                )
+            await workspace_data_changed(Invoice.get_collection_name(), workspace.id)
+        if new_incomes:
+            for income in new_incomes:
+                income.fingerprint = income.compute_fingerprint()
+            result = await IncomeTransaction.insert_many(new_incomes)
+            for income, income_id in zip(new_incomes, result.inserted_ids):
+                income.id = income_id
+            record_income(new_incomes)
+            audit_log.record_created(new_incomes, entity_type="income", actor_id=user.id)
+            await index_documents(new_incomes)
+        await workspace_data_changed(IncomeTransaction.get_collection_name(), workspace.id)
+
+    return {
+        "lines": len(lines),
+        "applied": auto_reconcile,
+        "reconciled": [
+            {**_serialize_line(line), "match": _serialize_candidate(candidate)}
+            for line, candidate in confident
+        ],
+        "ambiguous": ambiguous,
+        "unmatched": unmatched,
+    }
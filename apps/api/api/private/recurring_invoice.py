@@ -0,0 +1,422 @@
+import asyncio
+import calendar
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import List, Optional
+from uuid import uuid4
+
+from beanie import PydanticObjectId
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from pymongo.errors import BulkWriteError
+
+from app.core.audit import audit_log, snapshot
+from app.core.config import config
+from app.core.email import send_email
+from app.core.jwt import FastJWT
+from app.core.line_item_catalog import record_line_item_usage
+from app.core.locks import acquire_lease
+from app.core.metrics import INVOICES_CREATED
+from app.core.search import index_documents
+from app.core.versions import workspace_data_changed
+from api.private.invoice import (
+    InvoiceItemPayload,
+    _allocate_invoice_numbers,
+    _build_public_invoice_url,
+    _compute_totals,
+)
+from models.models import (
+    AuditAction,
+    Invoice,
+    InvoiceStatus,
+    Person,
+    RecurrenceFrequency,
+    RecurringInvoiceTemplate,
+    User,
+    Workspace,
+)
+from utils.get_current_workspace import get_current_workspace
+
+
+logger = logging.getLogger(__name__)
+
+recurring_invoice_router = APIRouter(prefix="/recurring-invoice")
+
+MAX_CATCH_UP_RUNS = 12
+RECURRING_INVOICES_LEASE = "recurring_invoices"
+DUPLICATE_KEY_ERROR = 11000
+
+
+class RecurringInvoiceCreate(BaseModel):
+    person_id: PydanticObjectId
+    name: Optional[str] = None
+    frequency: RecurrenceFrequency = RecurrenceFrequency.monthly
+    interval: int = Field(1, ge=1, le=365)
+    start_date: datetime
+    end_date: Optional[datetime] = None
+    due_in_days: int = Field(30, ge=0, le=365)
+    currency: str = "GBP"
+    items: List[InvoiceItemPayload] = Field(default_factory=list)
+    notes: Optional[str] = None
+    payment_details: Optional[str] = None
+    tax_rate: float = 0.0
+    status: InvoiceStatus = InvoiceStatus.issued
+    is_public: bool = False
+    send_email: bool = False
+
+
+class RecurringInvoiceUpdate(BaseModel):
+    name: Optional[str] = None
+    frequency: Optional[RecurrenceFrequency] = None
+    interval: Optional[int] = Field(None, ge=1, le=365)
+    end_date: Optional[datetime] = None
+    next_run_at: Optional[datetime] = None
+    due_in_days: Optional[int] = Field(None, ge=0, le=365)
+    items: Optional[List[InvoiceItemPayload]] = None
+    notes: Optional[str] = None
+    payment_details: Optional[str] = None
+    tax_rate: Optional[float] = None
+    status: Optional[InvoiceStatus] = None
+    is_public: Optional[bool] = None
+    send_email: Optional[bool] = None
+    is_active: Optional[bool] = None
+
+
+def _add_months(value: datetime, months: int, anchor_day: int) -> datetime:
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(anchor_day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def _next_occurrence(template: RecurringInvoiceTemplate, current: datetime) -> datetime:
+    if template.frequency == RecurrenceFrequency.weekly:
+        return current + timedelta(weeks=template.interval)
+    if template.frequency == RecurrenceFrequency.monthly:
+        return _add_months(current, template.interval, template.start_date.day)
+    return current + timedelta(days=template.interval)
+
+
+def _validate_template(template: RecurringInvoiceTemplate) -> None:
+    if template.send_email and not template.is_public:
+        raise HTTPException(
+            status_code=400,
+            detail="Invoice must be public to include a link.",
+        )
+    if template.end_date and template.end_date < template.start_date:
+        raise HTTPException(status_code=400, detail="end_date must be after start_date")
+
+
+def _apply_items(template: RecurringInvoiceTemplate, items: List[InvoiceItemPayload], tax_rate: float) -> None:
+    line_items, subtotal, tax_amount, total = _compute_totals(items, tax_rate)
+    template.items = line_items
+    template.tax_rate = tax_rate
+    template.subtotal = subtotal
+    template.tax_amount = tax_amount
+    template.total = total
+
+
+async def _get_template(template_id: PydanticObjectId, workspace_id: PydanticObjectId) -> RecurringInvoiceTemplate:
+    template = await RecurringInvoiceTemplate.find_one(
+        {"_id": template_id, "workspace_id": workspace_id, "is_archived": False}
+    )
+    if not template:
+        raise HTTPException(status_code=404, detail="Recurring invoice not found")
+    return template
+
+
+@recurring_invoice_router.post("/")
+async def create_recurring_invoice(
+    payload: RecurringInvoiceCreate,
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+):
+    person = await Person.find_one(
+        Person.id == payload.person_id,
+        Person.workspace_id == workspace.id,
+        Person.is_archived == False,
+    )
+
+    if not person:
+        raise HTTPException(status_code=404, detail="Person not found")
+
+    template = RecurringInvoiceTemplate(
+        workspace_id=workspace.id,
+        next_run_at=payload.start_date,
+        **payload.model_dump(exclude={"items", "tax_rate"}),
+    )
+    _apply_items(template, payload.items, payload.tax_rate)
+    _validate_template(template)
+    await template.insert()
+    audit_log.record(
+        workspace_id=workspace.id,
+        entity_type="recurring_invoice",
+        entity_id=template.id,
+        action=AuditAction.create,
+        actor_id=user.id,
+        after=snapshot(template),
+    )
+    return template
+
+
+@recurring_invoice_router.get("/")
+async def list_recurring_invoices(
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+):
+    return await RecurringInvoiceTemplate.find(
+        {"workspace_id": workspace.id, "is_archived": False}
+    ).sort("next_run_at").to_list()
+
+
+@recurring_invoice_router.get("/{template_id}")
+async def get_recurring_invoice(
+    template_id: PydanticObjectId,
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+):
+    return await _get_template(template_id, workspace.id)
+
+
+@recurring_invoice_router.patch("/{template_id}")
+async def update_recurring_invoice(
+    template_id: PydanticObjectId,
+    payload: RecurringInvoiceUpdate,
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+):
+    template = await _get_template(template_id, workspace.id)
+    before = snapshot(template)
+
+    update_data = payload.model_dump(exclude_unset=True)
+    if "items" in update_data or "tax_rate" in update_data:
+        items = payload.items if payload.items is not None else template.items
+        tax_rate = update_data.get("tax_rate", template.tax_rate)
+        _apply_items(template, items, tax_rate)
+
+    for field, value in update_data.items():
+        if field in {"items", "tax_rate"}:
+            continue
+        setattr(template, field, value)
+
+    _validate_template(template)
+    template.updated_at = datetime.utcnow()
+    await template.save()
+    audit_log.record(
+        workspace_id=workspace.id,
+        entity_type="recurring_invoice",
+        entity_id=template.id,
+        action=AuditAction.update,
+        actor_id=user.id,
+        before=before,
+        after=snapshot(template),
+    )
+    return template
+
+
+@recurring_invoice_router.delete("/{template_id}")
+async def archive_recurring_invoice(
+    template_id: PydanticObjectId,
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+):
+    template = await _get_template(template_id, workspace.id)
+    before = snapshot(template)
+
+    template.is_archived = True
+    template.is_active = False
+    template.updated_at = datetime.utcnow()
+    await template.save()
+    audit_log.record(
+        workspace_id=workspace.id,
+        entity_type="recurring_invoice",
+        entity_id=template.id,
+        action=AuditAction.archive,
+        actor_id=user.id,
+        before=before,
+        after=snapshot(template),
+    )
+
+    return {"ok": True}
+
+
+# --------------------
+# Generator
+# --------------------
+
+
+async def _claim_template(template: RecurringInvoiceTemplate, now: datetime) -> list[datetime]:
+    """Advance ``next_run_at`` past ``now`` and return the run dates it covered.
+
+    The update is conditional on the previously read ``next_run_at`` so only one
+    worker materializes a given run.
+    """
+    run_dates: list[datetime] = []
+    next_run_at = template.next_run_at
+    while next_run_at <= now and len(run_dates) < MAX_CATCH_UP_RUNS:
+        if template.end_date and next_run_at > template.end_date:
+            break
+        run_dates.append(next_run_at)
+        next_run_at = _next_occurrence(template, next_run_at)
+
+    still_active = not template.end_date or next_run_at <= template.end_date
+    result = await RecurringInvoiceTemplate.find_one(
+        {"_id": template.id, "next_run_at": template.next_run_at}
+    ).update(
+        {
+            "$set": {
+                "next_run_at": next_run_at,
+                "last_run_at": now,
+                "is_active": still_active,
+                "updated_at": now,
+            }
+        }
+    )
+    if not result or not result.modified_count:
+        return []
+    return run_dates
+
+
+def _build_invoice(template: RecurringInvoiceTemplate, run_date: datetime, number: str) -> Invoice:
+    return Invoice(
+        workspace_id=template.workspace_id,
+        person_id=template.person_id,
+        number=number,
+        public_id=str(uuid4()),
+        status=template.status,
+        currency=template.currency,
+        issue_date=run_date,
+        due_date=run_date + timedelta(days=template.due_in_days),
+        items=template.items,
+        notes=template.notes,
+        payment_details=template.payment_details,
+        tax_rate=template.tax_rate,
+        subtotal=template.subtotal,
+        tax_amount=template.tax_amount,
+        total=template.total,
+        is_public=template.is_public,
+        recurring_template_id=template.id,
+        recurring_run_at=run_date,
+    )
+
+
+async def _release_claim(template: RecurringInvoiceTemplate, now: datetime) -> None:
+    """Undo ``_claim_template`` so the runs are retried on the next pass."""
+    await RecurringInvoiceTemplate.find_one({"_id": template.id, "last_run_at": now}).update(
+        {
+            "$set": {
+                "next_run_at": template.next_run_at,
+                "last_run_at": template.last_run_at,
+                "is_active": template.is_active,
+            }
+        }
+    )
+
+
+async def _insert_generated(invoices: list[Invoice]) -> list[Invoice]:
+    """Insert generated invoices and return them, minus runs that already exist."""
+    for invoice in invoices:
+        invoice.id = PydanticObjectId()
+    try:
+        await Invoice.insert_many(invoices, ordered=False)
+    except BulkWriteError as exc:
+        errors = exc.details.get("writeErrors", [])
+        if any(error.get("code") != DUPLICATE_KEY_ERROR for error in errors):
+            raise
+        existing = {error["index"] for error in errors}
+        return [invoice for index, invoice in enumerate(invoices) if index not in existing]
+    return invoices
+
+
+async def _send_generated_invoice_emails(invoices: list[Invoice]) -> None:
+    person_ids = list({invoice.person_id for invoice in invoices})
+    persons = await Person.find({"_id": {"$in": person_ids}}).to_list()
+    emails = {person.id: person.email for person in persons if person.email}
+
+    for invoice in invoices:
+        email = emails.get(invoice.person_id)
+        if not email:
+            continue
+        invoice_url = _build_public_invoice_url(invoice.public_id)
+        try:
+            await send_email(
+                to=email,
+                subject=f"Invoice {invoice.number}",
+                body=(
+                    f"Invoice {invoice.number} issued for {invoice.total:.2f} {invoice.currency}."
+                    f"\nView invoice: {invoice_url}"
+                ),
+            )
+        except Exception:
+            logger.exception("Failed to send recurring invoice %s", invoice.number)
+
+
+async def generate_due_invoices(now: Optional[datetime] = None) -> int:
+    """Materialize every due recurring invoice across all workspaces."""
+    now = now or datetime.utcnow()
+    generated = 0
+
+    while True:
+        templates = await RecurringInvoiceTemplate.find(
+            {"is_active": True, "is_archived": False, "next_run_at": {"$lte": now}}
+        ).sort("next_run_at").limit(config.RECURRING_INVOICES_BATCH_SIZE).to_list()
+        if not templates:
+            break
+
+        runs_by_workspace: dict[PydanticObjectId, list[tuple[RecurringInvoiceTemplate, datetime]]] = defaultdict(list)
+        for template in templates:
+            for run_date in await _claim_template(template, now):
+                runs_by_workspace[template.workspace_id].append((template, run_date))
+
+        to_email: list[Invoice] = []
+        for workspace_id, runs in runs_by_workspace.items():
+            claimed = {template.id: template for template, _ in runs}
+            numbers = await _allocate_invoice_numbers(workspace_id, len(runs))
+            invoices = [
+                _build_invoice(template, run_date, number)
+                for (template, run_date), number in zip(runs, numbers)
+            ]
+            try:
+                invoices = await _insert_generated(invoices)
+            except Exception:
+                logger.exception("Failed to insert recurring invoices for workspace %s", workspace_id)
+                await Invoice.find({"_id": {"$in": [invoice.id for invoice in invoices]}}).delete()
+                for template in claimed.values():
+                    await _release_claim(template, now)
+                continue
+            INVOICES_CREATED.labels(source="recurring").inc(len(invoices))
+            audit_log.record_created(invoices, entity_type="invoice")
+            await index_documents(invoices)
+            await workspace_data_changed(Invoice.get_collection_name(), workspace_id)
+            try:
+                for invoice in invoices:
+                    await record_line_item_usage(workspace_id, invoice.currency, invoice.items)
+            except Exception:
+                logger.exception("Failed to record line item usage for workspace %s", workspace_id)
+            generated += len(invoices)
+            to_email.extend(
+                invoice for invoice in invoices if claimed[invoice.recurring_template_id].send_email
+            )
+
+        if to_email:
+            await _send_generated_invoice_emails(to_email)
+
+        if len(templates) < config.RECURRING_INVOICES_BATCH_SIZE:
+            break
+
+    return generated
+
+
+async def run_recurring_invoice_scheduler() -> None:
+    lease_seconds = config.RECURRING_INVOICES_INTERVAL_SECONDS * 3
+    while True:
+        try:
+            if await acquire_lease(RECURRING_INVOICES_LEASE, lease_seconds):
+                generated = await generate_due_invoices()
+                if generated:
+                    logger.info("Generated %s recurring invoices", generated)
+        except Exception:
+            logger.exception("Recurring invoice generation failed")
+        await asyncio.sleep(config.RECURRING_INVOICES_INTERVAL_SECONDS)
@@ -0,0 +1,25 @@
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, Query
+
+from app.core.jwt import FastJWT
+from app.core.search import search_workspace
+from models.models import User, Workspace
+from utils.get_current_workspace import get_current_workspace
+
+
+search_router = APIRouter(prefix="/search")
+
+
+@search_router.get("")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    types: List[Literal["person", "invoice", "income"]] = Query(default=[]),
+    limit: int = Query(20, ge=1, le=100),
+    user: User = Depends(FastJWT().login_required),
+    workspace: Workspace = Depends(get_current_workspace),
+):
+    return {
+        "query": q,
+        "hits": await search_workspace(workspace.id, q, entity_types=types, limit=limit),
+    }
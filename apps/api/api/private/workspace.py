@@ -6,10 +6,14 @@ from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from bson.dbref import DBRef
 from pydantic import BaseModel, EmailStr
 
+from app.core.archive import TIERED_MODELS, restore_workspace_records
+from app.core.cache import invalidate_workspace_data
 from app.core.config import config
 from app.core.email import send_email
 from app.core.jwt import FastJWT
+from app.core.versions import bump_collection_versions, etag_matches, list_etag, workspace_data_changed
 from models.models import User, Workspace, WorkspaceInvite, WorkspaceReactivationToken
+from utils.get_current_workspace import find_default_workspace, workspace_membership_filter
 
 workspace_router = APIRouter(prefix="/workspace")
 
@@ -96,24 +100,21 @@ def _build_reactivation_url(token: str) -> str:
     base_url = (config.FRONTEND_URL or config.API_BASE_URL).rstrip("/")
     return f"{base_url}/workspace/reactivate/{token}"
 
-async def _normalize_workspace_links(workspace: Workspace) -> None:
-    member_ids = _member_ids(workspace)
-    if member_ids:
-        members = await User.find({"_id": {"$in": member_ids}}).to_list()
-        members_by_id = {str(member.id): member for member in members}
-        resolved_members = [
-            members_by_id[member_id]
-            for member_id in member_ids
-            if member_id in members_by_id
-        ]
-        if resolved_members:
-            workspace.members = resolved_members
-
-    owner_id = _owner_id(workspace)
-    if owner_id and not hasattr(workspace.owner, "id"):
-        owner_user = await User.get(PydanticObjectId(owner_id))
-        if owner_user:
-            workspace.owner = owner_user
+def _member_ref(user_id: PydanticObjectId) -> DBRef:
+    return DBRef(User.get_collection_name(), PydanticObjectId(user_id))
+
+
+def _active_workspace_filter(workspace_id: PydanticObjectId) -> dict:
+    return {"_id": workspace_id, "is_archived": {"$ne": True}}
+
+
+async def _workspace_changed(workspace: Workspace) -> None:
+    """Bump the workspace list version of the owner and every member and drop workspace caches."""
+    await bump_collection_versions(
+        Workspace.get_collection_name(),
+        [_owner_id(workspace), *_member_object_ids(workspace)],
+    )
+    invalidate_workspace_data(Workspace.get_collection_name(), workspace.id)
 
 
 @workspace_router.get("/")
@@ -122,14 +123,13 @@ async def list_workspaces(
     response: Response,
     user: User = Depends(FastJWT().login_required),
 ):
-    all_workspaces = await Workspace.find(
-        {"is_archived": {"$ne": True}}
-    ).to_list()
-    workspaces = [
-        workspace
-        for workspace in all_workspaces
-        if _user_in_workspace(workspace, user.id)
-    ]
+    etag = await list_etag(request, user.id, Workspace.get_collection_name())
+    # Without the cookie the full response is needed to set it.
+    if "X-Workspace-ID" in request.cookies and etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    workspaces = await Workspace.find(workspace_membership_filter(user.id)).to_list()
 
     if workspaces and "X-Workspace-ID" not in request.cookies:
         response.set_cookie(
@@ -153,13 +153,7 @@ async def get_default_workspace(
     response: Response,
     user: User = Depends(FastJWT().login_required),
 ):
-    all_workspaces = await Workspace.find(
-        {"is_archived": {"$ne": True}}
-    ).to_list()
-    workspace = next(
-        (item for item in all_workspaces if _user_in_workspace(item, user.id)),
-        None,
-    )
+    workspace = await find_default_workspace(user)
 
     if not workspace:
         raise HTTPException(
@@ -193,6 +187,7 @@ async def create_workspace(
 
     workspace = Workspace(name=name, owner=user, members=[user])
     await workspace.insert()
+    await bump_collection_versions(Workspace.get_collection_name(), [user.id])
 
     return {"id": str(workspace.id), "name": workspace.name, "owner_id": _owner_id(workspace)}
 
@@ -242,6 +237,12 @@ async def select_workspace(
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
 
+    if user.default_workspace_id != workspace.id:
+        await User.find_one({"_id": user.id}).update(
+            {"$set": {"default_workspace_id": workspace.id}}
+        )
+        user.default_workspace_id = workspace.id
+
     response.set_cookie(
         key="X-Workspace-ID",
         value=str(workspace.id),
@@ -271,9 +272,11 @@ async def update_workspace(
     if not name:
         raise HTTPException(status_code=400, detail="Workspace name is required")
 
+    await Workspace.find_one(_active_workspace_filter(workspace.id)).update(
+        {"$set": {"name": name}}
+    )
+    await _workspace_changed(workspace)
     workspace.name = name
-    await _normalize_workspace_links(workspace)
-    await workspace.save()
 
     return {"id": str(workspace.id), "name": workspace.name}
 
@@ -293,7 +296,6 @@ async def delete_workspace(
     if _owner_id(workspace) != str(user.id):
         raise HTTPException(status_code=403, detail="Only the owner can delete the workspace")
 
-    workspace.is_archived = True
     token = str(uuid4())
     reset_entry = WorkspaceReactivationToken(
         workspace_id=workspace.id,
@@ -312,8 +314,10 @@ async def delete_workspace(
             f"Reactivate it here: {reactivation_url}\n"
         ),
     )
-    await _normalize_workspace_links(workspace)
-    await workspace.save()
+    await Workspace.find_one({"_id": workspace.id}).update(
+        {"$set": {"is_archived": True, "archived_at": datetime.utcnow()}}
+    )
+    await _workspace_changed(workspace)
     return {"ok": True}
 
 
@@ -406,23 +410,19 @@ async def accept_workspace_invite(
     if invite.email.lower() != user.email.lower():
         raise HTTPException(status_code=403, detail="Invite email does not match your account")
 
-    workspace = await Workspace.find_one(
-        {"_id": invite.workspace_id, "is_archived": {"$ne": True}}
-    )
-    if not workspace:
+    result = await Workspace.find_one(
+        _active_workspace_filter(invite.workspace_id)
+    ).update({"$addToSet": {"members": _member_ref(user.id)}})
+    if not result or not result.matched_count:
         raise HTTPException(status_code=404, detail="Workspace not found")
+    await bump_collection_versions(Workspace.get_collection_name(), [user.id])
+    invalidate_workspace_data(Workspace.get_collection_name(), invite.workspace_id)
 
-    member_ids = _member_ids(workspace)
-    if str(user.id) not in member_ids:
-        workspace.members.append(user)
-        await _normalize_workspace_links(workspace)
-        await workspace.save()
-
-    invite.accepted_at = datetime.utcnow()
-    invite.accepted_by = user.id
-    await invite.save()
+    await WorkspaceInvite.find_one({"_id": invite.id, "accepted_at": None}).update(
+        {"$set": {"accepted_at": datetime.utcnow(), "accepted_by": user.id}}
+    )
 
-    return {"ok": True, "workspace_id": str(workspace.id)}
+    return {"ok": True, "workspace_id": str(invite.workspace_id)}
 
 
 @workspace_router.delete("/{workspace_id}/invites/{invite_id}")
@@ -472,17 +472,12 @@ async def remove_workspace_member(
     if _owner_id(workspace) == str(member_id):
         raise HTTPException(status_code=400, detail="You cannot remove the workspace owner")
 
-    member_ids = _member_ids(workspace)
-    if member_id not in member_ids:
+    result = await Workspace.find_one(_active_workspace_filter(workspace.id)).update(
+        {"$pull": {"members": _member_ref(member_id)}}
+    )
+    if not result or not result.modified_count:
         raise HTTPException(status_code=404, detail="Member not found")
-
-    workspace.members = [
-        member
-        for member in workspace.members
-        if _extract_member_id(member) != str(member_id)
-    ]
-    await _normalize_workspace_links(workspace)
-    await workspace.save()
+    await _workspace_changed(workspace)
     return {"ok": True}
 
 
@@ -501,13 +496,10 @@ async def leave_workspace(
     if _owner_id(workspace) == str(user.id):
         raise HTTPException(status_code=400, detail="Owner cannot leave their workspace")
 
-    workspace.members = [
-        member
-        for member in workspace.members
-        if _extract_member_id(member) != str(user.id)
-    ]
-    await _normalize_workspace_links(workspace)
-    await workspace.save()
+    await Workspace.find_one(_active_workspace_filter(workspace.id)).update(
+        {"$pull": {"members": _member_ref(user.id)}}
+    )
+    await _workspace_changed(workspace)
     return {"ok": True}
 
 
@@ -530,9 +522,15 @@ async def reactivate_workspace(
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
 
-    workspace.is_archived = False
-    await _normalize_workspace_links(workspace)
-    await workspace.save()
+    # Reactivate first so the tiering job stops selecting this workspace.
+    await Workspace.find_one({"_id": workspace.id}).update(
+        {"$set": {"is_archived": False, "archived_at": None}}
+    )
+    if workspace.is_archived and workspace.archived_at:
+        await restore_workspace_records(workspace.id, workspace.archived_at)
+    await _workspace_changed(workspace)
+    for document_cls in TIERED_MODELS:
+        await workspace_data_changed(document_cls.get_collection_name(), workspace.id)
 
     token_entry.used_at = datetime.utcnow()
     await token_entry.save()
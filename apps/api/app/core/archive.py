@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Type
+
+from beanie import Document
+from bson import ObjectId
+from pymongo import ReplaceOne
+
+from app.core.config import config
+from app.core.database import db
+from app.core.locks import acquire_lease
+from app.core.versions import bump_collection_versions
+from models.models import IncomeTransaction, Invoice, Person, Workspace
+
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_TIERING_LEASE = "archive_tiering"
+TIERED_MODELS: list[Type[Document]] = [Person, Invoice, IncomeTransaction]
+# Bookkeeping fields that only live on documents in transit or in cold storage.
+TIERING_FIELDS = ("tiered_at", "workspace_archived_at", "tiering_claim")
+
+
+def hot_collection(document_cls: Type[Document]):
+    return db[document_cls.get_collection_name()]
+
+
+def cold_collection(document_cls: Type[Document]):
+    return db[f"{document_cls.get_collection_name()}_archive"]
+
+
+async def _move(source, target, query: dict, batch_size: int, stamp: dict) -> int:
+    """Copy matching documents to ``target`` then delete them from ``source``.
+
+    Each batch is claimed with a fresh ``tiering_claim`` first and only
+    claimed documents are deleted. Copies drop the claim, so a document that
+    a concurrent move in the other direction already put back is left alone.
+    Copies are upserts keyed by ``_id``, so a crashed run can simply be
+    retried without losing or duplicating records.
+    """
+    moved = 0
+    while True:
+        found = await source.find(query, {"_id": 1}).limit(batch_size).to_list(length=batch_size)
+        if not found:
+            return moved
+
+        ids = [document["_id"] for document in found]
+        claimed = {"_id": {"$in": ids}, "tiering_claim": ObjectId()}
+        await source.update_many(
+            {"_id": {"$in": ids}, **query},
+            {"$set": {"tiering_claim": claimed["tiering_claim"]}},
+        )
+        documents = await source.find(claimed).to_list(length=batch_size)
+        if documents:
+            operations = []
+            for document in documents:
+                for name in TIERING_FIELDS:
+                    document.pop(name, None)
+                document.update(stamp)
+                operations.append(ReplaceOne({"_id": document["_id"]}, document, upsert=True))
+            await target.bulk_write(operations, ordered=False)
+            result = await source.delete_many(claimed)
+            moved += result.deleted_count
+        if len(found) < batch_size:
+            return moved
+
+
+async def move_to_cold(
+    document_cls: Type[Document],
+    query: dict,
+    workspace_archived_at: Optional[datetime] = None,
+) -> int:
+    workspace_ids = await hot_collection(document_cls).distinct("workspace_id", query)
+    stamp: dict = {"tiered_at": datetime.utcnow()}
+    if workspace_archived_at:
+        stamp["workspace_archived_at"] = workspace_archived_at
+    moved = await _move(
+        hot_collection(document_cls),
+        cold_collection(document_cls),
+        query,
+        config.ARCHIVE_TIERING_BATCH_SIZE,
+        stamp,
+    )
+    if moved:
+        await bump_collection_versions(document_cls.get_collection_name(), workspace_ids)
+    return moved
+
+
+async def restore_from_cold(document_cls: Type[Document], query: dict) -> int:
+    return await _move(
+        cold_collection(document_cls),
+        hot_collection(document_cls),
+        query,
+        config.ARCHIVE_TIERING_BATCH_SIZE,
+        {},
+    )
+
+
+async def tier_archived_records(now: Optional[datetime] = None) -> int:
+    """Move records archived for longer than ARCHIVE_AFTER_DAYS to cold collections."""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=config.ARCHIVE_AFTER_DAYS)
+    # Legacy archives without ``archived_at`` are stamped by
+    # ``backfill_archived_at``, so this stays on the partial archive index.
+    archived_before_cutoff = {"is_archived": True, "archived_at": {"$lte": cutoff}}
+
+    moved = 0
+    for document_cls in TIERED_MODELS:
+        moved += await move_to_cold(document_cls, archived_before_cutoff)
+
+    archived_workspaces = await Workspace.find(
+        {"is_archived": True, "archived_at": {"$lte": cutoff}}
+    ).to_list()
+    for workspace in archived_workspaces:
+        for document_cls in TIERED_MODELS:
+            moved += await move_to_cold(
+                document_cls, {"workspace_id": workspace.id}, workspace.archived_at
+            )
+        # Reactivation flips the workspace before restoring, so anything moved
+        # after that point is ours to put back.
+        still_archived = await Workspace.find_one(
+            {"_id": workspace.id, "is_archived": True, "archived_at": workspace.archived_at}
+        )
+        if not still_archived:
+            await restore_workspace_records(workspace.id, workspace.archived_at)
+    return moved
+
+
+async def restore_workspace_records(workspace_id, archived_at: datetime) -> int:
+    """Pull back records tiered because of the workspace archive stamped ``archived_at``.
+
+    Records the user archived on their own and that were tiered separately
+    stay in cold storage.
+    """
+    restored = 0
+    for document_cls in TIERED_MODELS:
+        restored += await restore_from_cold(
+            document_cls, {"workspace_id": workspace_id, "workspace_archived_at": archived_at}
+        )
+    return restored
+
+
+async def ensure_cold_indexes() -> None:
+    for document_cls in TIERED_MODELS:
+        await cold_collection(document_cls).create_index("workspace_id")
+        await cold_collection(document_cls).create_index(
+            [("workspace_id", 1), ("workspace_archived_at", 1)]
+        )
+
+
+async def run_archive_tiering_scheduler() -> None:
+    lease_seconds = config.ARCHIVE_TIERING_INTERVAL_SECONDS * 3
+    while True:
+        try:
+            if await acquire_lease(ARCHIVE_TIERING_LEASE, lease_seconds):
+                moved = await tier_archived_records()
+                if moved:
+                    logger.info("Moved %s archived records to cold storage", moved)
+        except Exception:
+            logger.exception("Archive tiering failed")
+        await asyncio.sleep(config.ARCHIVE_TIERING_INTERVAL_SECONDS)
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+from beanie import Document, PydanticObjectId
+
+from app.core.config import config
+from models.models import AuditAction, AuditEvent
+
+
+logger = logging.getLogger(__name__)
+
+IGNORED_FIELDS = {"id", "revision_id", "updated_at", "fingerprint"}
+
+
+def snapshot(document: Optional[Document]) -> dict[str, Any]:
+    if document is None:
+        return {}
+    return document.model_dump(mode="json", exclude=IGNORED_FIELDS)
+
+
+def diff_fields(before: dict[str, Any], after: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    changes: dict[str, dict[str, Any]] = {}
+    for field in before.keys() | after.keys():
+        old_value = before.get(field)
+        new_value = after.get(field)
+        if old_value != new_value:
+            changes[field] = {"from": old_value, "to": new_value}
+    return changes
+
+
+class AuditLog:
+    """Write-behind buffer for audit events.
+
+    ``record`` only appends to memory; events are written with ``insert_many``
+    by a background task every ``flush_interval`` seconds, or sooner once
+    ``max_batch`` events are waiting.
+    """
+
+    def __init__(self, *, flush_interval: float, max_batch: int):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._buffer: list[AuditEvent] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def record(
+        self,
+        *,
+        workspace_id: PydanticObjectId,
+        entity_type: str,
+        entity_id: PydanticObjectId,
+        action: AuditAction,
+        actor_id: Optional[PydanticObjectId] = None,
+        before: Optional[dict[str, Any]] = None,
+        after: Optional[dict[str, Any]] = None,
+    ) -> None:
+        changes = diff_fields(before or {}, after or {})
+        if action == AuditAction.update and not changes:
+            return
+        self._buffer.append(
+            AuditEvent(
+                workspace_id=workspace_id,
+                entity_type=entity_type,
+                entity_id=entity_id,
+                action=action,
+                actor_id=actor_id,
+                changes=changes,
+                ts=datetime.utcnow(),
+            )
+        )
+        if len(self._buffer) >= self.max_batch:
+            self._wakeup.set()
+
+    def record_created(
+        self,
+        documents: Iterable[Document],
+        *,
+        entity_type: str,
+        actor_id: Optional[PydanticObjectId] = None,
+    ) -> None:
+        for document in documents:
+            self.record(
+                workspace_id=document.workspace_id,
+                entity_type=entity_type,
+                entity_id=document.id,
+                action=AuditAction.create,
+                actor_id=actor_id,
+                after=snapshot(document),
+            )
+
+    async def flush(self) -> int:
+        if not self._buffer:
+            return 0
+        batch, self._buffer = self._buffer, []
+        try:
+            await AuditEvent.insert_many(batch)
+        except asyncio.CancelledError:
+            self._buffer = batch + self._buffer
+            raise
+        except Exception:
+            logger.exception("Failed to write %s audit events", len(batch))
+            # Keep the events for the next attempt, bounded to avoid unbounded growth.
+            self._buffer = (batch + self._buffer)[-self.max_batch * 10:]
+            return 0
+        return len(batch)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # Let the loop finish its current flush instead of cancelling it mid-write.
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+
+audit_log = AuditLog(
+    flush_interval=config.AUDIT_FLUSH_INTERVAL_SECONDS,
+    max_batch=config.AUDIT_FLUSH_BATCH_SIZE,
+)
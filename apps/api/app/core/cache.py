@@ -0,0 +1,109 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class WorkspaceCache:
+    """Small in-process TTL/LRU cache whose keys are scoped to a workspace.
+
+    Entries are stored under ``(workspace_id, key)`` so every entry of a
+    workspace can be dropped at once when its underlying data changes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        ttl_seconds: float,
+        max_entries: int = 1024,
+        depends_on: tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.depends_on = set(depends_on)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+
+    def get(self, workspace_id: Hashable, key: Hashable) -> Any | None:
+        key = (str(workspace_id), key)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, workspace_id: Hashable, key: Hashable, value: Any) -> None:
+        key = (str(workspace_id), key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_workspace(self, workspace_id: Hashable) -> None:
+        workspace_key = str(workspace_id)
+        for key in [key for key in self._entries if key[0] == workspace_key]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_caches: dict[str, WorkspaceCache] = {}
+_publishers: list[Callable[[str, Hashable], None]] = []
+
+
+def workspace_cache(
+    name: str,
+    *,
+    ttl_seconds: float,
+    max_entries: int = 1024,
+    depends_on: tuple[str, ...] = (),
+) -> WorkspaceCache:
+    cache = _caches.get(name)
+    if cache is None:
+        cache = WorkspaceCache(
+            name,
+            ttl_seconds=ttl_seconds,
+            max_entries=max_entries,
+            depends_on=depends_on,
+        )
+        _caches[name] = cache
+    return cache
+
+
+def invalidate_local_workspace_data(collection: str, workspace_id: Hashable) -> None:
+    """Drop this worker's cached entries built from ``collection`` for a workspace."""
+    for cache in _caches.values():
+        if collection in cache.depends_on:
+            cache.invalidate_workspace(workspace_id)
+
+
+def clear_local_caches() -> None:
+    """Drop every entry of every cache in this worker."""
+    for cache in _caches.values():
+        cache.clear()
+
+
+def invalidate_workspace_data(collection: str, workspace_id: Hashable) -> None:
+    """Invalidate locally and notify other workers through registered publishers."""
+    invalidate_local_workspace_data(collection, workspace_id)
+    for publish in _publishers:
+        publish(collection, workspace_id)
+
+
+def add_invalidation_publisher(publish: Callable[[str, Hashable], None]) -> None:
+    if publish not in _publishers:
+        _publishers.append(publish)
+
+
+def registered_caches() -> list[WorkspaceCache]:
+    return list(_caches.values())
@@ -12,15 +12,57 @@ class Config(BaseSettings):
 
     DATABASE_NAME: str
     DATABASE_URL: str
+    RUN_MIGRATIONS_ON_STARTUP: bool = True
+    REQUIRE_INDEXES: bool = False
 
     API_BASE_URL: str
     FRONTEND_URL: Optional[str] = None
 
     SENTRY_DSN: Optional[str] = None
     SENTRY_TRACES_SAMPLE_RATE: float = 0.0
+    SENTRY_PROFILES_SAMPLE_RATE: float = 0.0
     SENTRY_ENVIRONMENT: Optional[str] = None
 
     METRICS_TOKEN: Optional[str] = None
+    METRICS_REFRESH_INTERVAL_SECONDS: int = 60
+
+    READINESS_CACHE_SECONDS: float = 5.0
+    READINESS_INDEX_CHECK_SECONDS: float = 300.0
+    READINESS_DB_TIMEOUT_SECONDS: float = 2.0
+    READINESS_MAX_AUDIT_BACKLOG: int = 5000
+    READINESS_MAX_POOL_UTILIZATION: float = 0.95
+
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILING_INTERVAL_SECONDS: float = 0.001
+    STACK_SAMPLER_ENABLED: bool = False
+    STACK_SAMPLER_DIR: str = "/tmp/creda-stacks"
+    STACK_SAMPLER_INTERVAL_SECONDS: float = 0.05
+    STACK_SAMPLER_FLUSH_SECONDS: float = 60.0
+    STACK_SAMPLER_MAX_FILES: int = 60
+
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["memory", "mongo"] = "memory"
+    # Proxy addresses/CIDRs whose X-Forwarded-For is trusted for client IPs.
+    TRUSTED_PROXIES: List[str] = []
+    AUTH_RATE_LIMIT_PER_IP: int = 30
+    AUTH_RATE_LIMIT_PER_EMAIL: int = 5
+    AUTH_RATE_LIMIT_WINDOW_SECONDS: int = 300
+
+    RECURRING_INVOICES_ENABLED: bool = True
+    RECURRING_INVOICES_INTERVAL_SECONDS: int = 300
+    RECURRING_INVOICES_BATCH_SIZE: int = 200
+
+    ARCHIVE_TIERING_ENABLED: bool = True
+    ARCHIVE_AFTER_DAYS: int = 90
+    ARCHIVE_TIERING_INTERVAL_SECONDS: int = 3600
+    ARCHIVE_TIERING_BATCH_SIZE: int = 500
+
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 2.0
+    AUDIT_FLUSH_BATCH_SIZE: int = 500
+
+    CACHE_INVALIDATION_BUS_ENABLED: bool = True
+    CACHE_INVALIDATION_COLLECTION: str = "cache_invalidations"
+    CACHE_INVALIDATION_COLLECTION_BYTES: int = 1024 * 1024
 
     JWT_SECRET_KEY: str
     PASSWORDS_SALT_SECRET_KEY: str
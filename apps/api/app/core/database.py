@@ -1,7 +1,8 @@
 import motor.motor_asyncio
 from app.core.config import config
+from app.core.metrics import pool_listener
 
 client = motor.motor_asyncio.AsyncIOMotorClient(
-    config.DATABASE_URL, uuidRepresentation="standard"
+    config.DATABASE_URL, uuidRepresentation="standard", event_listeners=[pool_listener]
 )
 db = client[config.DATABASE_NAME]
\ No newline at end of file
@@ -1,4 +1,5 @@
 from app.core.config import config
+from app.core.metrics import EMAILS
 from email.message import EmailMessage
 import aiosmtplib
 from typing import Optional
@@ -18,6 +19,7 @@ async def send_email(
         config.SMTP_SENDER,
     ]):
         print("SMTP is not fully configured, skipping email sending.")
+        EMAILS.labels(status="skipped").inc()
         return
 
     message = EmailMessage()
@@ -26,6 +28,15 @@ async def send_email(
     message["Subject"] = subject
     message.set_content(body)
 
+    try:
+        await _deliver(message)
+    except Exception:
+        EMAILS.labels(status="failed").inc()
+        raise
+    EMAILS.labels(status="sent").inc()
+
+
+async def _deliver(message: EmailMessage) -> None:
     if config.ENV == "production":
         await aiosmtplib.send(
             message,
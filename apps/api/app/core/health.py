@@ -0,0 +1,105 @@
+import asyncio
+import time
+from typing import Any, Type
+
+from beanie import Document
+
+from app.core.audit import audit_log
+from app.core.config import config
+from app.core.database import db
+from app.core.indexes import missing_indexes
+from app.core.invalidation_bus import invalidation_bus
+from app.core.metrics import pool_listener
+
+
+class _Cached:
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.value: Any = None
+        self.expires_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def get(self, compute):
+        if self.value is not None and time.monotonic() < self.expires_at:
+            return self.value
+        # Concurrent probes share a single refresh.
+        async with self.lock:
+            if self.value is None or time.monotonic() >= self.expires_at:
+                self.value = await compute()
+                self.expires_at = time.monotonic() + self.ttl_seconds
+        return self.value
+
+
+_readiness = _Cached(config.READINESS_CACHE_SECONDS)
+_indexes = _Cached(config.READINESS_INDEX_CHECK_SECONDS)
+
+
+async def _check_database() -> dict:
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout=config.READINESS_DB_TIMEOUT_SECONDS)
+    except Exception as exc:
+        return {"status": "fail", "error": type(exc).__name__}
+    return {"status": "ok", "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+
+async def _check_indexes(document_models: list[Type[Document]]) -> dict:
+    async def compute() -> dict:
+        try:
+            missing = await missing_indexes(document_models)
+        except Exception as exc:
+            return {"status": "fail", "error": type(exc).__name__}
+        if not missing:
+            return {"status": "ok"}
+        return {"status": "fail" if config.REQUIRE_INDEXES else "warn", "missing": missing}
+
+    return await _indexes.get(compute)
+
+
+def _check_queues() -> dict:
+    backlog = {
+        "audit_events": len(audit_log),
+        "cache_invalidations": invalidation_bus.pending,
+    }
+    saturated = backlog["audit_events"] >= config.READINESS_MAX_AUDIT_BACKLOG
+    return {"status": "warn" if saturated else "ok", "backlog": backlog}
+
+
+def _check_pool() -> dict:
+    # Saturation is reported, not failed: under a load spike every pod would
+    # drop out of the load balancer at once.
+    max_size = pool_listener.max_pool_size or 1
+    servers = {
+        server: round(checked_out / max_size, 3)
+        for server, checked_out in dict(pool_listener.checked_out_by_server).items()
+    }
+    utilization = max(servers.values(), default=0.0)
+    saturated = utilization >= config.READINESS_MAX_POOL_UTILIZATION
+    return {
+        "status": "warn" if saturated else "ok",
+        "checked_out": pool_listener.checked_out,
+        "max_size_per_server": pool_listener.max_pool_size,
+        "utilization": utilization,
+        "utilization_by_server": servers,
+    }
+
+
+async def readiness(document_models: list[Type[Document]]) -> dict:
+    """Run dependency checks, reusing results for READINESS_CACHE_SECONDS."""
+
+    async def compute() -> dict:
+        database = await _check_database()
+        checks = {
+            "database": database,
+            "indexes": (
+                await _check_indexes(document_models)
+                if database["status"] == "ok"
+                else {"status": "skipped"}
+            ),
+            "queues": _check_queues(),
+            "pool": _check_pool(),
+        }
+        ready = all(check["status"] != "fail" for check in checks.values())
+        return {"status": "ready" if ready else "unavailable", "checks": checks}
+
+    return await _readiness.get(compute)
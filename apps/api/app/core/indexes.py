@@ -0,0 +1,88 @@
+import logging
+from typing import Type
+
+from beanie import Document
+from pymongo import IndexModel
+
+from app.core.config import config
+from app.core.database import db
+
+
+logger = logging.getLogger(__name__)
+
+
+def _declared_indexes(document_cls: Type[Document]) -> list[tuple[tuple, dict]]:
+    """Return ``(key, options)`` pairs from a model's ``Settings.indexes``."""
+    settings = getattr(document_cls, "Settings", None)
+    declared = []
+    for index in getattr(settings, "indexes", None) or []:
+        if isinstance(index, str):
+            declared.append((((index, 1),), {}))
+        elif isinstance(index, IndexModel):
+            document = dict(index.document)
+            key = tuple(document.pop("key").items())
+            document.pop("name", None)
+            declared.append((key, document))
+        else:
+            declared.append((tuple(index), {}))
+    return declared
+
+
+def _collection(document_cls: Type[Document]):
+    return db[document_cls.get_collection_name()]
+
+
+async def prepare_ttl_indexes(document_models: list[Type[Document]]) -> None:
+    """Turn existing plain indexes into the TTL indexes the models now declare.
+
+    MongoDB refuses to create an index whose key already exists with other
+    options, so this has to run before ``init_beanie`` creates indexes.
+    """
+    for document_cls in document_models:
+        ttl_indexes = [
+            (key, options["expireAfterSeconds"])
+            for key, options in _declared_indexes(document_cls)
+            if "expireAfterSeconds" in options
+        ]
+        if not ttl_indexes:
+            continue
+
+        collection = _collection(document_cls)
+        existing = await collection.index_information()
+        for key, expire_after in ttl_indexes:
+            for info in existing.values():
+                if tuple(info["key"]) != key or "expireAfterSeconds" in info:
+                    continue
+                await db.command(
+                    "collMod",
+                    collection.name,
+                    index={"keyPattern": dict(key), "expireAfterSeconds": expire_after},
+                )
+                logger.info("Converted %s index %s to TTL", collection.name, key)
+
+
+async def missing_indexes(document_models: list[Type[Document]]) -> list[str]:
+    missing: list[str] = []
+    for document_cls in document_models:
+        collection = _collection(document_cls)
+        existing = await collection.index_information()
+        existing_by_key = {tuple(info["key"]): info for info in existing.values()}
+        for key, options in _declared_indexes(document_cls):
+            info = existing_by_key.get(key)
+            expire_after = options.get("expireAfterSeconds")
+            if info is None or (
+                expire_after is not None and info.get("expireAfterSeconds") != expire_after
+            ):
+                fields = ", ".join(f"{field}:{direction}" for field, direction in key)
+                missing.append(f"{collection.name}({fields})")
+    return missing
+
+
+async def verify_indexes(document_models: list[Type[Document]]) -> None:
+    missing = await missing_indexes(document_models)
+    if missing:
+        logger.error("Missing MongoDB indexes: %s", "; ".join(missing))
+        if config.REQUIRE_INDEXES:
+            raise RuntimeError(f"Missing MongoDB indexes: {'; '.join(missing)}")
+    else:
+        logger.info("All declared MongoDB indexes are present")
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from uuid import uuid4
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+from app.core.cache import add_invalidation_publisher, clear_local_caches, invalidate_local_workspace_data
+from app.core.config import config
+from app.core.database import db
+
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = uuid4().hex
+
+
+@dataclass(frozen=True)
+class InvalidationEvent:
+    collection: str
+    workspace_id: str
+
+    def to_document(self) -> dict:
+        return {
+            "collection": self.collection,
+            "workspace_id": self.workspace_id,
+            "origin": WORKER_ID,
+            "ts": datetime.utcnow(),
+        }
+
+
+class InvalidationBus:
+    """Fan cache invalidations out to every worker through a capped collection.
+
+    Each worker publishes the invalidations it applies locally and tails the
+    collection with a tailable cursor, applying events published by others.
+    A worker that falls behind the capped collection clears all its caches.
+    """
+
+    def __init__(self, collection_name: str, size_bytes: int):
+        self.collection_name = collection_name
+        self.size_bytes = size_bytes
+        self._pending: set[InvalidationEvent] = set()
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def collection(self):
+        return db[self.collection_name]
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def publish(self, event: InvalidationEvent) -> None:
+        if not self._tasks:
+            return
+        self._pending.add(event)
+        self._wakeup.set()
+
+    async def _ensure_collection(self) -> None:
+        try:
+            await db.create_collection(
+                self.collection_name, capped=True, size=self.size_bytes
+            )
+        except CollectionInvalid:
+            pass
+
+    async def _publish_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            events, self._pending = self._pending, set()
+            if not events:
+                continue
+            try:
+                await self.collection.insert_many(
+                    [event.to_document() for event in events], ordered=False
+                )
+            except Exception:
+                logger.exception("Failed to publish %s cache invalidations", len(events))
+
+    async def _subscribe_loop(self) -> None:
+        # ObjectIds come from each publishing worker, so they are not ordered
+        # across workers. Resume by natural (insertion) order instead: re-tail
+        # from the start and skip up to the last document already applied.
+        latest = await self.collection.find().sort("$natural", -1).limit(1).to_list(length=1)
+        last_id = latest[0]["_id"] if latest else None
+
+        while True:
+            skipping = False
+            if last_id is not None:
+                if await self.collection.count_documents({"_id": last_id}, limit=1):
+                    skipping = True
+                else:
+                    # Our position was overwritten, so events may have been missed.
+                    clear_local_caches()
+                    last_id = None
+            try:
+                cursor = self.collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for document in cursor:
+                        if skipping:
+                            skipping = document["_id"] != last_id
+                            continue
+                        last_id = document["_id"]
+                        if document.get("origin") == WORKER_ID:
+                            continue
+                        invalidate_local_workspace_data(
+                            document["collection"], document["workspace_id"]
+                        )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Cache invalidation subscription failed")
+            # A tailable cursor on an empty collection dies immediately.
+            await asyncio.sleep(1)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        await self._ensure_collection()
+        add_invalidation_publisher(self._publish_invalidation)
+        self._tasks = [
+            asyncio.create_task(self._publish_loop()),
+            asyncio.create_task(self._subscribe_loop()),
+        ]
+
+    def _publish_invalidation(self, collection: str, workspace_id) -> None:
+        self.publish(InvalidationEvent(collection=collection, workspace_id=str(workspace_id)))
+
+    def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+
+invalidation_bus = InvalidationBus(
+    config.CACHE_INVALIDATION_COLLECTION,
+    config.CACHE_INVALIDATION_COLLECTION_BYTES,
+)
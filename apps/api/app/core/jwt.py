@@ -83,6 +83,11 @@ class FastJWT:
         request: Request,
         access_token: str | None = Cookie(default=None),
     ) -> User:
+        # Sub-requests of /private/batch reuse the user authenticated for the batch.
+        batch_user = getattr(request.state, "batch_user", None)
+        if batch_user is not None:
+            return batch_user
+
         token = access_token
 
         if not token:
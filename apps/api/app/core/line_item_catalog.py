@@ -0,0 +1,236 @@
+import logging
+import re
+from datetime import datetime
+from typing import Iterable, Optional
+
+from bson.decimal128 import Decimal128
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from app.core.cache import invalidate_workspace_data, workspace_cache
+from app.core.database import db
+from models.models import Invoice, InvoiceLineItem, quantize_money, to_decimal
+
+
+logger = logging.getLogger(__name__)
+
+CATALOG_COLLECTION = "line_item_catalog"
+# Memory budget: a trie node costs roughly 350 bytes (node, children dict and
+# a top list of up to TOP_PER_PREFIX references), so MAX_TRIE_NODES caps one
+# workspace at about 7 MB and the cache at about 225 MB per worker in the
+# worst case. Typical catalogs are far smaller.
+MAX_CATALOG_ENTRIES = 5000
+MAX_TRIE_NODES = 20000
+MAX_WORD_STARTS = 3
+MAX_SUFFIX_CHARS = 32
+TOP_PER_PREFIX = 20
+TRIE_CACHE_WORKSPACES = 32
+WORD_START = re.compile(r"(?:^|(?<=\s))\S")
+
+trie_cache = workspace_cache(
+    "line_item_catalog",
+    ttl_seconds=3600,
+    max_entries=TRIE_CACHE_WORKSPACES,
+    depends_on=(CATALOG_COLLECTION,),
+)
+
+
+def catalog_key(description: str) -> str:
+    return description.strip().lower()
+
+
+class _TrieNode:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: dict[str, _TrieNode] = {}
+        self.top: list[dict] = []
+
+
+class LineItemTrie:
+    """Prefix trie over catalog descriptions.
+
+    The first ``MAX_WORD_STARTS`` word starts of a description are inserted,
+    each up to ``MAX_SUFFIX_CHARS`` deep, so "consulting" finds "Hourly
+    consulting". Entries are inserted most-used first and each node keeps the
+    first ``TOP_PER_PREFIX`` it sees, so a lookup is a walk down the prefix
+    with no ranking work. Once ``MAX_TRIE_NODES`` exist no new nodes are
+    created, which spends the budget on the most-used entries.
+    """
+
+    def __init__(self, entries: Iterable[dict]):
+        self.root = _TrieNode()
+        self.size = 0
+        self.nodes = 0
+        for entry in sorted(entries, key=lambda entry: (-entry["usage_count"], entry["key"])):
+            self._insert(entry)
+            self.size += 1
+
+    def _insert(self, entry: dict) -> None:
+        key = entry["key"]
+        visited: set[int] = set()
+        for match in list(WORD_START.finditer(key))[:MAX_WORD_STARTS]:
+            node = self.root
+            for char in key[match.start():match.start() + MAX_SUFFIX_CHARS]:
+                child = node.children.get(char)
+                if child is None:
+                    if self.nodes >= MAX_TRIE_NODES:
+                        break
+                    child = node.children[char] = _TrieNode()
+                    self.nodes += 1
+                node = child
+                if id(node) not in visited and len(node.top) < TOP_PER_PREFIX:
+                    visited.add(id(node))
+                    node.top.append(entry)
+
+    def complete(self, prefix: str, limit: int) -> list[dict]:
+        prefix = catalog_key(prefix)
+        node = self.root
+        for char in prefix[:MAX_SUFFIX_CHARS]:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        if len(prefix) <= MAX_SUFFIX_CHARS:
+            return node.top[:limit]
+        return [entry for entry in node.top if prefix in entry["key"]][:limit]
+
+
+def _serialize(entry: dict) -> dict:
+    return {
+        "description": entry["description"],
+        "unit_price": to_decimal(entry.get("unit_price")),
+        "currency": entry.get("currency"),
+        "usage_count": entry["usage_count"],
+        "last_used_at": entry.get("last_used_at"),
+    }
+
+
+async def _load_trie(workspace_id) -> LineItemTrie:
+    entries = (
+        await db[CATALOG_COLLECTION]
+        .find(
+            {"workspace_id": workspace_id},
+            {"_id": 0, "key": 1, "description": 1, "unit_price": 1, "currency": 1, "usage_count": 1, "last_used_at": 1},
+        )
+        .sort("usage_count", DESCENDING)
+        .limit(MAX_CATALOG_ENTRIES)
+        .to_list(length=MAX_CATALOG_ENTRIES)
+    )
+    trie = LineItemTrie(_serialize(entry) | {"key": entry["key"]} for entry in entries)
+    trie_cache.set(workspace_id, "trie", trie)
+    return trie
+
+
+async def autocomplete(workspace_id, prefix: str, limit: int = 10) -> list[dict]:
+    trie = trie_cache.get(workspace_id, "trie")
+    if trie is None:
+        trie = await _load_trie(workspace_id)
+    return [
+        {key: value for key, value in entry.items() if key != "key"}
+        for entry in trie.complete(prefix, limit)
+    ]
+
+
+async def record_line_item_usage(
+    workspace_id,
+    currency: str,
+    items: list[InvoiceLineItem],
+    previous_items: Optional[list[InvoiceLineItem]] = None,
+) -> None:
+    """Count items of a saved invoice; on updates only newly added descriptions count."""
+    previous_keys = {catalog_key(item.description) for item in previous_items or []}
+    now = datetime.utcnow()
+    operations = []
+    for item in items:
+        key = catalog_key(item.description)
+        if not key or key in previous_keys:
+            continue
+        previous_keys.add(key)
+        operations.append(
+            UpdateOne(
+                {"workspace_id": workspace_id, "key": key},
+                {
+                    "$inc": {"usage_count": 1},
+                    "$set": {
+                        "description": item.description.strip(),
+                        "unit_price": Decimal128(str(quantize_money(item.unit_price))),
+                        "currency": currency,
+                        "last_used_at": now,
+                    },
+                },
+                upsert=True,
+            )
+        )
+    if not operations:
+        return
+
+    await db[CATALOG_COLLECTION].bulk_write(operations, ordered=False)
+    # The trie is rebuilt lazily by the next autocomplete lookup.
+    invalidate_workspace_data(CATALOG_COLLECTION, workspace_id)
+
+
+async def ensure_catalog_indexes() -> None:
+    await db[CATALOG_COLLECTION].create_index(
+        [("workspace_id", ASCENDING), ("key", ASCENDING)], unique=True
+    )
+    await db[CATALOG_COLLECTION].create_index(
+        [("workspace_id", ASCENDING), ("usage_count", DESCENDING)]
+    )
+
+
+async def backfill_line_item_catalog(before: Optional[datetime] = None) -> None:
+    """Build the catalog from invoices created before ``before``.
+
+    Runs in the background while invoices are saved, so usage recorded live
+    since ``before`` is added to, not replaced by, the historical counts.
+    Catalogs that already hold entries older than ``before`` were built by an
+    earlier release and are left alone.
+    """
+    before = before or datetime.utcnow()
+    if await db[CATALOG_COLLECTION].find_one({"last_used_at": {"$lt": before}}):
+        return
+
+    pipeline = [
+        {"$match": {"items.0": {"$exists": True}, "created_at": {"$not": {"$gte": before}}}},
+        {"$sort": {"issue_date": 1}},
+        {"$unwind": "$items"},
+        {
+            "$set": {
+                "key": {"$toLower": {"$trim": {"input": "$items.description"}}},
+            }
+        },
+        {"$match": {"key": {"$ne": ""}}},
+        {
+            "$group": {
+                "_id": {"workspace_id": "$workspace_id", "key": "$key"},
+                "description": {"$last": {"$trim": {"input": "$items.description"}}},
+                "unit_price": {"$last": {"$toDecimal": "$items.unit_price"}},
+                "currency": {"$last": "$currency"},
+                "usage_count": {"$sum": 1},
+                "last_used_at": {"$last": "$issue_date"},
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "workspace_id": "$_id.workspace_id",
+                "key": "$_id.key",
+                "description": 1,
+                "unit_price": 1,
+                "currency": 1,
+                "usage_count": 1,
+                "last_used_at": 1,
+            }
+        },
+        {
+            "$merge": {
+                "into": CATALOG_COLLECTION,
+                "on": ["workspace_id", "key"],
+                "whenMatched": [
+                    {"$set": {"usage_count": {"$add": ["$usage_count", "$$new.usage_count"]}}}
+                ],
+                "whenNotMatched": "insert",
+            }
+        },
+    ]
+    await db[Invoice.get_collection_name()].aggregate(pipeline).to_list(length=None)
+    logger.info("Built line item catalog from invoice history")
@@ -0,0 +1,52 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+from uuid import uuid4
+
+from pymongo.errors import DuplicateKeyError
+
+from app.core.database import db
+
+
+logger = logging.getLogger(__name__)
+
+LOCKS_COLLECTION = "scheduler_locks"
+COMPLETED_JOBS_COLLECTION = "completed_jobs"
+OWNER_ID = uuid4().hex
+
+
+async def acquire_lease(name: str, ttl_seconds: float) -> bool:
+    """Take or renew the lease ``name`` for this worker; False if another worker holds it."""
+    now = datetime.utcnow()
+    try:
+        await db[LOCKS_COLLECTION].update_one(
+            {"_id": name, "$or": [{"owner": OWNER_ID}, {"expires_at": {"$lte": now}}]},
+            {"$set": {"owner": OWNER_ID, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def release_lease(name: str) -> None:
+    await db[LOCKS_COLLECTION].delete_one({"_id": name, "owner": OWNER_ID})
+
+
+async def run_once(name: str, job: Callable[[], Awaitable[object]], lease_seconds: float = 3600) -> bool:
+    """Run ``job`` on a single worker until it has completed once for this database."""
+    if await db[COMPLETED_JOBS_COLLECTION].find_one({"_id": name}):
+        return False
+    if not await acquire_lease(name, lease_seconds):
+        return False
+    try:
+        await job()
+        await db[COMPLETED_JOBS_COLLECTION].update_one(
+            {"_id": name}, {"$set": {"completed_at": datetime.utcnow()}}, upsert=True
+        )
+    except Exception:
+        logger.exception("One-off job %s failed", name)
+        return False
+    finally:
+        await release_lease(name)
+    return True
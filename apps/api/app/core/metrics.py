@@ -0,0 +1,261 @@
+import asyncio
+import gc
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Iterable
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+from pymongo.common import MAX_POOL_SIZE
+
+from app.core.cache import registered_caches
+from app.core.config import config
+from models.models import IncomeTransaction, Invoice, InvoiceStatus
+
+
+logger = logging.getLogger(__name__)
+
+DOMAIN_METRICS_LEASE = "domain_metrics_refresh"
+DOMAIN_METRICS_COLLECTION = "domain_metrics"
+
+
+# --------------------
+# Domain
+# --------------------
+
+INVOICES_CREATED = Counter(
+    "creda_invoices_created_total",
+    "Invoices created",
+    ["source"],
+)
+INVOICES_PAID = Counter(
+    "creda_invoices_paid_total",
+    "Invoices marked as paid",
+    ["source"],
+)
+INVOICES_OVERDUE = Gauge(
+    "creda_invoices_overdue",
+    "Issued invoices past their due date; every worker reports the same shared count",
+)
+EMAILS = Counter(
+    "creda_emails_total",
+    "Outgoing emails by delivery outcome",
+    ["status"],
+)
+INCOME_RECORDED = Counter(
+    "creda_income_recorded_total",
+    "Income transactions recorded",
+    ["source_type"],
+)
+
+
+def record_income(incomes: Iterable[IncomeTransaction]) -> None:
+    for income in incomes:
+        INCOME_RECORDED.labels(source_type=income.source_type.value).inc()
+
+
+async def _refresh_domain_gauges(db) -> None:
+    overdue = await Invoice.find(
+        {
+            "status": InvoiceStatus.issued,
+            "is_archived": False,
+            "due_date": {"$lt": datetime.utcnow()},
+        }
+    ).count()
+    await db[DOMAIN_METRICS_COLLECTION].update_one(
+        {"_id": "invoices_overdue"},
+        {"$set": {"value": overdue, "refreshed_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+async def _load_domain_gauges(db) -> None:
+    overdue = await db[DOMAIN_METRICS_COLLECTION].find_one({"_id": "invoices_overdue"})
+    if overdue:
+        INVOICES_OVERDUE.set(overdue["value"])
+
+
+async def run_domain_metrics_refresher() -> None:
+    """Recompute cross-workspace gauges on one worker and report them on all.
+
+    The lease holder runs the counting query and stores the result in
+    ``domain_metrics``; every worker reads that document back, so each
+    scrape sees the same value whichever worker answers it.
+    """
+    # app.core.database imports this module for its pool listener.
+    from app.core.database import db
+    from app.core.locks import acquire_lease
+
+    lease_seconds = config.METRICS_REFRESH_INTERVAL_SECONDS * 3
+    while True:
+        try:
+            if await acquire_lease(DOMAIN_METRICS_LEASE, lease_seconds):
+                await _refresh_domain_gauges(db)
+            await _load_domain_gauges(db)
+        except Exception:
+            logger.exception("Failed to refresh domain metrics")
+        await asyncio.sleep(config.METRICS_REFRESH_INTERVAL_SECONDS)
+
+
+# --------------------
+# Runtime
+# --------------------
+
+_event_loop_lag = 0.0
+
+EVENT_LOOP_LAG = Gauge(
+    "creda_event_loop_lag_seconds",
+    "How late the event loop woke up for the last lag probe",
+)
+EVENT_LOOP_LAG.set_function(lambda: _event_loop_lag)
+
+GC_PAUSES = Histogram(
+    "creda_gc_pause_seconds",
+    "Garbage collector pause duration",
+    ["generation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5),
+)
+
+
+async def run_event_loop_lag_probe(interval: float = 0.5) -> None:
+    global _event_loop_lag
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        _event_loop_lag = max(loop.time() - started - interval, 0.0)
+
+
+_gc_started_at: dict[int, float] = {}
+
+
+def _gc_callback(phase: str, info: dict) -> None:
+    generation = info.get("generation", 0)
+    if phase == "start":
+        _gc_started_at[generation] = time.perf_counter()
+    elif generation in _gc_started_at:
+        GC_PAUSES.labels(generation=str(generation)).observe(
+            time.perf_counter() - _gc_started_at.pop(generation)
+        )
+
+
+def install_gc_callback() -> None:
+    if _gc_callback not in gc.callbacks:
+        gc.callbacks.append(_gc_callback)
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Track Mongo connection pool usage from pymongo's CMAP events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.checked_out = 0
+        self.checkout_failures = 0
+        self.max_pool_size = MAX_POOL_SIZE
+        # maxPoolSize applies per server, so saturation is tracked per address.
+        self.checked_out_by_server: dict[str, int] = {}
+
+    def _add(self, field: str, delta: int) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + delta)
+
+    def pool_created(self, event):
+        self.max_pool_size = event.options.get("maxPoolSize", self.max_pool_size)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add("connections", 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add("connections", -1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._add("checkout_failures", 1)
+
+    def _add_checked_out(self, event, delta: int) -> None:
+        server = "%s:%s" % event.address
+        with self._lock:
+            self.checked_out += delta
+            self.checked_out_by_server[server] = self.checked_out_by_server.get(server, 0) + delta
+
+    def connection_checked_out(self, event):
+        self._add_checked_out(event, 1)
+
+    def connection_checked_in(self, event):
+        self._add_checked_out(event, -1)
+
+
+pool_listener = PoolMetricsListener()
+
+
+class RuntimeCollector:
+    """Read pool and cache state only when ``/metrics`` is scraped."""
+
+    def collect(self):
+        connections = GaugeMetricFamily(
+            "creda_mongo_pool_connections",
+            "Open MongoDB connections",
+        )
+        connections.add_metric([], pool_listener.connections)
+        yield connections
+
+        checked_out = GaugeMetricFamily(
+            "creda_mongo_pool_checked_out",
+            "MongoDB connections currently in use",
+        )
+        checked_out.add_metric([], pool_listener.checked_out)
+        yield checked_out
+
+        max_size = GaugeMetricFamily(
+            "creda_mongo_pool_max_size",
+            "Configured MongoDB pool size per server",
+        )
+        max_size.add_metric([], pool_listener.max_pool_size)
+        yield max_size
+
+        failures = CounterMetricFamily(
+            "creda_mongo_pool_checkout_failures",
+            "MongoDB connection checkouts that failed",
+        )
+        failures.add_metric([], pool_listener.checkout_failures)
+        yield failures
+
+        hits = CounterMetricFamily("creda_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("creda_cache_misses", "Cache misses", labels=["cache"])
+        entries = GaugeMetricFamily("creda_cache_entries", "Cached entries", labels=["cache"])
+        for cache in registered_caches():
+            hits.add_metric([cache.name], cache.hits)
+            misses.add_metric([cache.name], cache.misses)
+            entries.add_metric([cache.name], len(cache))
+        yield hits
+        yield misses
+        yield entries
+
+
+REGISTRY.register(RuntimeCollector())
+
+
+def start_metrics_tasks() -> list[asyncio.Task]:
+    install_gc_callback()
+    return [
+        asyncio.create_task(run_event_loop_lag_probe()),
+        asyncio.create_task(run_domain_metrics_refresher()),
+    ]
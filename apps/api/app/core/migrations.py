@@ -0,0 +1,160 @@
+import logging
+from datetime import datetime
+
+from beanie import PydanticObjectId
+from bson.dbref import DBRef
+from pymongo import UpdateOne
+
+from app.core.database import db
+from models.models import IncomeTransaction, Invoice, Person, User, Workspace, income_fingerprint
+from utils.get_current_workspace import _extract_member_id
+
+
+logger = logging.getLogger(__name__)
+
+
+def _decimal(field: str, places: int | None = 2) -> dict:
+    value = f"${field}" if places is None else {"$round": [f"${field}", places]}
+    return {
+        "$cond": [
+            {"$eq": [{"$type": f"${field}"}, "double"]},
+            {"$toDecimal": value},
+            f"${field}",
+        ]
+    }
+
+
+def _decimal_items() -> dict:
+    return {
+        "$map": {
+            "input": {"$ifNull": ["$items", []]},
+            "as": "item",
+            "in": {
+                "$mergeObjects": [
+                    "$$item",
+                    {
+                        "unit_price": {"$toDecimal": "$$item.unit_price"},
+                        "total": {"$toDecimal": {"$round": ["$$item.total", 2]}},
+                    },
+                ]
+            },
+        }
+    }
+
+
+async def migrate_money_to_decimal() -> None:
+    """Convert money fields stored as binary doubles to Decimal128 (idempotent)."""
+    income_result = await db["income_transactions"].update_many(
+        {"amount": {"$type": "double"}},
+        [{"$set": {"amount": _decimal("amount")}}],
+    )
+
+    totals_filter = {
+        "$or": [
+            {"total": {"$type": "double"}},
+            {"subtotal": {"$type": "double"}},
+            {"tax_amount": {"$type": "double"}},
+            {"items.total": {"$type": "double"}},
+            {"items.unit_price": {"$type": "double"}},
+        ]
+    }
+    totals_update = [
+        {
+            "$set": {
+                "subtotal": _decimal("subtotal"),
+                "tax_amount": _decimal("tax_amount"),
+                "total": _decimal("total"),
+                "items": _decimal_items(),
+            }
+        }
+    ]
+    invoice_result = await db["invoices"].update_many(totals_filter, totals_update)
+    template_result = await db["recurring_invoice_templates"].update_many(
+        totals_filter, totals_update
+    )
+
+    converted = (
+        income_result.modified_count
+        + invoice_result.modified_count
+        + template_result.modified_count
+    )
+    if converted:
+        logger.info("Converted %s documents to Decimal128 money fields", converted)
+
+
+async def backfill_income_fingerprints(batch_size: int = 1000) -> None:
+    """Set ``fingerprint`` on income recorded before it existed (idempotent)."""
+    collection = db["income_transactions"]
+    cursor = collection.find(
+        {"fingerprint": None},
+        {"workspace_id": 1, "person_id": 1, "amount": 1, "currency": 1, "received_at": 1, "reference": 1},
+    )
+    operations: list[UpdateOne] = []
+    updated = 0
+    async for income in cursor:
+        fingerprint = income_fingerprint(
+            income["workspace_id"],
+            income["person_id"],
+            income.get("amount"),
+            income.get("currency"),
+            income["received_at"],
+            income.get("reference"),
+        )
+        operations.append(UpdateOne({"_id": income["_id"]}, {"$set": {"fingerprint": fingerprint}}))
+        if len(operations) >= batch_size:
+            updated += (await collection.bulk_write(operations, ordered=False)).modified_count
+            operations = []
+    if operations:
+        updated += (await collection.bulk_write(operations, ordered=False)).modified_count
+    if updated:
+        logger.info("Backfilled fingerprints on %s income transactions", updated)
+
+
+def _user_ref(member: object):
+    member_id = _extract_member_id(member)
+    if not member_id or not PydanticObjectId.is_valid(member_id):
+        return None
+    return DBRef(User.get_collection_name(), PydanticObjectId(member_id))
+
+
+async def normalize_workspace_members() -> None:
+    """Store workspace owners and members as DBRefs (idempotent).
+
+    Membership updates use ``$addToSet``/``$pull`` with DBRefs and lookups
+    filter on ``members.$id``, so members stored in legacy shapes (plain ids,
+    strings or embedded dicts) would otherwise never match.
+    """
+    collection = db[Workspace.get_collection_name()]
+    operations: list[UpdateOne] = []
+    async for workspace in collection.find({}, {"owner": 1, "members": 1}):
+        members = []
+        for member in workspace.get("members") or []:
+            ref = _user_ref(member)
+            if ref is not None and ref not in members:
+                members.append(ref)
+        owner = _user_ref(workspace.get("owner")) or workspace.get("owner")
+        if members != workspace.get("members") or owner != workspace.get("owner"):
+            operations.append(
+                UpdateOne({"_id": workspace["_id"]}, {"$set": {"members": members, "owner": owner}})
+            )
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+        logger.info("Normalized members of %s workspaces", len(operations))
+
+
+async def backfill_archived_at() -> None:
+    """Stamp ``archived_at`` on records archived before it was recorded (idempotent).
+
+    Tiering selects on ``archived_at``, so such records fall back to their
+    last update, or to now when that is missing too.
+    """
+    now = datetime.utcnow()
+    stamped = 0
+    for document_cls in (Workspace, Person, Invoice, IncomeTransaction):
+        result = await db[document_cls.get_collection_name()].update_many(
+            {"is_archived": True, "archived_at": None},
+            [{"$set": {"archived_at": {"$ifNull": ["$updated_at", now]}}}],
+        )
+        stamped += result.modified_count
+    if stamped:
+        logger.info("Stamped archived_at on %s archived documents", stamped)
@@ -0,0 +1,161 @@
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
+
+from app.core.config import config
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN_HEADER = "x-profile-token"
+PROFILE_FORMAT_HEADER = "x-profile-format"
+
+
+def _profile_requested(request: Request) -> bool:
+    token = request.headers.get(PROFILE_TOKEN_HEADER)
+    if not token or not config.PROFILING_TOKEN:
+        return False
+    return hmac.compare_digest(token, config.PROFILING_TOKEN)
+
+
+async def profiling_middleware(request: Request, call_next):
+    """Profile a single request when it carries a valid ``X-Profile-Token``.
+
+    The endpoint runs as usual but its body is discarded and a pyinstrument
+    report is returned instead. ``X-Profile-Format`` selects ``html``
+    (default), ``text`` or ``speedscope``.
+    """
+    if not _profile_requested(request):
+        return await call_next(request)
+
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        return JSONResponse(
+            status_code=501,
+            content={"detail": "Install pyinstrument to enable request profiling"},
+        )
+
+    profiler = Profiler(interval=config.PROFILING_INTERVAL_SECONDS, async_mode="enabled")
+    profiler.start()
+    try:
+        response = await call_next(request)
+        async for _ in response.body_iterator:
+            pass
+    finally:
+        profiler.stop()
+
+    headers = {"X-Profiled-Status": str(response.status_code)}
+    output_format = request.headers.get(PROFILE_FORMAT_HEADER, "html").lower()
+    if output_format == "text":
+        return PlainTextResponse(profiler.output_text(unicode=True), headers=headers)
+    if output_format == "speedscope":
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        return PlainTextResponse(
+            profiler.output(SpeedscopeRenderer()),
+            media_type="application/json",
+            headers=headers,
+        )
+    return HTMLResponse(profiler.output_html(), headers=headers)
+
+
+def _folded_stack(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler(threading.Thread):
+    """Periodically sample every thread's stack and write folded stacks to disk.
+
+    Runs in its own thread so it keeps sampling while the event loop is
+    blocked. Each flush writes one ``.folded`` file (``stack count`` per
+    line) that flamegraph.pl or speedscope can open; only the newest
+    ``max_files`` are kept.
+    """
+
+    def __init__(
+        self,
+        *,
+        directory: str,
+        interval: float,
+        flush_interval: float,
+        max_files: int,
+    ):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.directory = directory
+        self.interval = interval
+        self.flush_interval = flush_interval
+        self.max_files = max_files
+        self._stopped = threading.Event()
+        self._samples: Counter[str] = Counter()
+
+    def run(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        own_id = threading.get_ident()
+        next_flush = time.monotonic() + self.flush_interval
+        while not self._stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self._samples[_folded_stack(frame)] += 1
+            if time.monotonic() >= next_flush:
+                self.flush()
+                next_flush = time.monotonic() + self.flush_interval
+        self.flush()
+
+    def flush(self) -> Optional[str]:
+        samples, self._samples = self._samples, Counter()
+        if not samples:
+            return None
+        path = os.path.join(
+            self.directory, f"stacks-{os.getpid()}-{time.strftime('%Y%m%dT%H%M%S')}.folded"
+        )
+        try:
+            with open(path, "w") as handle:
+                for stack, count in samples.most_common():
+                    handle.write(f"{stack} {count}\n")
+            self._prune()
+        except OSError:
+            logger.exception("Failed to write stack samples to %s", path)
+            return None
+        return path
+
+    def _prune(self) -> None:
+        files = sorted(
+            (
+                os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.startswith(f"stacks-{os.getpid()}-")
+            ),
+            key=os.path.getmtime,
+        )
+        for path in files[: max(len(files) - self.max_files, 0)]:
+            os.remove(path)
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+def start_stack_sampler() -> Optional[StackSampler]:
+    if not config.STACK_SAMPLER_ENABLED:
+        return None
+    sampler = StackSampler(
+        directory=config.STACK_SAMPLER_DIR,
+        interval=config.STACK_SAMPLER_INTERVAL_SECONDS,
+        flush_interval=config.STACK_SAMPLER_FLUSH_SECONDS,
+        max_files=config.STACK_SAMPLER_MAX_FILES,
+    )
+    sampler.start()
+    return sampler
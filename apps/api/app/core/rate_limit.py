@@ -0,0 +1,176 @@
+import ipaddress
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, Request
+from prometheus_client import Counter
+from pymongo import ASCENDING
+
+from app.core.config import config
+from app.core.database import db
+
+
+RATE_LIMIT_ALLOWED = Counter(
+    "creda_rate_limit_allowed_total",
+    "Requests allowed by the rate limiter",
+    ["scope"],
+)
+RATE_LIMIT_THROTTLED = Counter(
+    "creda_rate_limit_throttled_total",
+    "Requests rejected by the rate limiter",
+    ["scope", "key_type"],
+)
+
+
+class MemoryWindowStore:
+    """Sliding window log kept in process memory (per worker)."""
+
+    def __init__(self):
+        self._hits: dict[str, deque[float]] = {}
+
+    async def count(self, key: str, window_seconds: int) -> tuple[int, float]:
+        now = time.monotonic()
+        hits = self._hits.get(key)
+        if not hits:
+            return 0, float(window_seconds)
+        while hits and hits[0] <= now - window_seconds:
+            hits.popleft()
+        retry_after = hits[0] + window_seconds - now if hits else float(window_seconds)
+        return len(hits), retry_after
+
+    async def add(self, key: str, window_seconds: int) -> None:
+        now = time.monotonic()
+        self._hits.setdefault(key, deque()).append(now)
+        if len(self._hits) > 10000:
+            self._prune(now, window_seconds)
+
+    def _prune(self, now: float, window_seconds: int) -> None:
+        stale = [
+            key
+            for key, hits in self._hits.items()
+            if not hits or hits[-1] <= now - window_seconds
+        ]
+        for key in stale:
+            del self._hits[key]
+
+
+class MongoWindowStore:
+    """Sliding window log shared across workers through a TTL collection."""
+
+    def __init__(self, collection_name: str = "rate_limit_hits"):
+        self.collection = db[collection_name]
+        self._index_ready = False
+
+    async def _ensure_index(self, window_seconds: int) -> None:
+        if self._index_ready:
+            return
+        await self.collection.create_index([("key", ASCENDING), ("ts", ASCENDING)])
+        await self.collection.create_index("ts", expireAfterSeconds=window_seconds)
+        self._index_ready = True
+
+    async def count(self, key: str, window_seconds: int) -> tuple[int, float]:
+        await self._ensure_index(window_seconds)
+        now = datetime.utcnow()
+        window_start = now - timedelta(seconds=window_seconds)
+        count = await self.collection.count_documents(
+            {"key": key, "ts": {"$gt": window_start}}
+        )
+        oldest = await self.collection.find_one(
+            {"key": key, "ts": {"$gt": window_start}},
+            sort=[("ts", ASCENDING)],
+        )
+        retry_after = float(window_seconds)
+        if oldest:
+            retry_after = (
+                oldest["ts"] + timedelta(seconds=window_seconds) - now
+            ).total_seconds()
+        return count, retry_after
+
+    async def add(self, key: str, window_seconds: int) -> None:
+        await self._ensure_index(window_seconds)
+        await self.collection.insert_one({"key": key, "ts": datetime.utcnow()})
+
+
+_trusted_proxies = [
+    ipaddress.ip_network(network, strict=False) for network in config.TRUSTED_PROXIES
+]
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in _trusted_proxies)
+
+
+def _client_ip(request: Request) -> str:
+    """Peer address, or the nearest untrusted hop of X-Forwarded-For behind a trusted proxy."""
+    host = request.client.host if request.client and request.client.host else "unknown"
+    if not _is_trusted_proxy(host):
+        return host
+    forwarded = request.headers.get("x-forwarded-for", "")
+    for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+        if not _is_trusted_proxy(hop):
+            return hop
+        host = hop
+    return host
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        scope: str,
+        *,
+        per_ip: int,
+        per_email: int,
+        window_seconds: int,
+    ):
+        self.scope = scope
+        self.per_ip = per_ip
+        self.per_email = per_email
+        self.window_seconds = window_seconds
+
+    async def check(self, request: Request, email: str | None = None) -> None:
+        if not config.RATE_LIMIT_ENABLED:
+            return
+
+        limits = [("ip", _client_ip(request), self.per_ip)]
+        if email:
+            limits.append(("email", email.strip().lower(), self.per_email))
+
+        # Only allowed attempts are recorded, so retrying while throttled does
+        # not extend the lockout, for the client or for a targeted email.
+        keys = []
+        for key_type, value, limit in limits:
+            key = f"{self.scope}:{key_type}:{value}"
+            count, retry_after = await _store.count(key, self.window_seconds)
+            if count >= limit:
+                RATE_LIMIT_THROTTLED.labels(self.scope, key_type).inc()
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests, please try again later",
+                    headers={"Retry-After": str(max(1, int(retry_after) + 1))},
+                )
+            keys.append(key)
+
+        for key in keys:
+            await _store.add(key, self.window_seconds)
+        RATE_LIMIT_ALLOWED.labels(self.scope).inc()
+
+
+_store = (
+    MongoWindowStore()
+    if config.RATE_LIMIT_BACKEND == "mongo"
+    else MemoryWindowStore()
+)
+
+
+def auth_rate_limiter(scope: str) -> RateLimiter:
+    return RateLimiter(
+        scope,
+        per_ip=config.AUTH_RATE_LIMIT_PER_IP,
+        per_email=config.AUTH_RATE_LIMIT_PER_EMAIL,
+        window_seconds=config.AUTH_RATE_LIMIT_WINDOW_SECONDS,
+    )
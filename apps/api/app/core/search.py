@@ -0,0 +1,212 @@
+import logging
+import re
+from datetime import datetime
+from typing import Iterable, Optional
+
+from beanie import Document
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from app.core.database import db
+from models.models import IncomeTransaction, Invoice, Person
+
+
+logger = logging.getLogger(__name__)
+
+SEARCH_COLLECTION = "search_index"
+MAX_TOKENS_PER_ENTRY = 256
+TOKEN_PATTERN = re.compile(r"[^\w]+", re.UNICODE)
+
+ENTITY_TYPES = {
+    Person: "person",
+    Invoice: "invoice",
+    IncomeTransaction: "income",
+}
+
+
+def tokenize(*values: Optional[str]) -> list[str]:
+    tokens: dict[str, None] = {}
+    for value in values:
+        if not value:
+            continue
+        for token in TOKEN_PATTERN.split(str(value).lower()):
+            if token:
+                tokens[token] = None
+    return list(tokens)
+
+
+def _person_entry(person: Person) -> dict:
+    return {
+        "title": person.name,
+        "subtitle": person.email or person.contact_person,
+        "title_tokens": tokenize(person.name),
+        "tokens": tokenize(
+            person.name,
+            person.email,
+            person.billing_email,
+            person.contact_person,
+            person.tax_id,
+            person.note,
+            *person.expense_tags,
+        ),
+    }
+
+
+def _invoice_entry(invoice: Invoice) -> dict:
+    return {
+        "title": invoice.number,
+        "subtitle": f"{invoice.total:.2f} {invoice.currency}",
+        "title_tokens": tokenize(invoice.number),
+        "tokens": tokenize(
+            invoice.number,
+            invoice.notes,
+            *(item.description for item in invoice.items),
+        ),
+    }
+
+
+def _income_entry(income: IncomeTransaction) -> dict:
+    title = income.reference or income.source_type.value
+    return {
+        "title": title,
+        "subtitle": f"{income.amount:.2f} {income.currency} · {income.received_at:%Y-%m-%d}",
+        "title_tokens": tokenize(income.reference),
+        "tokens": tokenize(income.reference, income.notes, *income.tags),
+    }
+
+
+ENTRY_BUILDERS = {
+    "person": _person_entry,
+    "invoice": _invoice_entry,
+    "income": _income_entry,
+}
+
+
+def _entry_update(document: Document) -> UpdateOne:
+    entity_type = ENTITY_TYPES[type(document)]
+    entry = ENTRY_BUILDERS[entity_type](document)
+    entry["tokens"] = entry["tokens"][:MAX_TOKENS_PER_ENTRY]
+    return UpdateOne(
+        {"entity_type": entity_type, "entity_id": document.id},
+        {
+            "$set": {
+                **entry,
+                "workspace_id": document.workspace_id,
+                "is_archived": document.is_archived,
+                "updated_at": datetime.utcnow(),
+            }
+        },
+        upsert=True,
+    )
+
+
+async def index_documents(documents: Iterable[Document]) -> None:
+    """Upsert the search entries of persons, invoices or income records."""
+    operations = [_entry_update(document) for document in documents]
+    if operations:
+        await db[SEARCH_COLLECTION].bulk_write(operations, ordered=False)
+
+
+async def index_document(document: Document) -> None:
+    await index_documents([document])
+
+
+async def ensure_search_indexes() -> None:
+    collection = db[SEARCH_COLLECTION]
+    await collection.create_index(
+        [("entity_type", ASCENDING), ("entity_id", ASCENDING)], unique=True
+    )
+    await collection.create_index(
+        [("workspace_id", ASCENDING), ("tokens", ASCENDING), ("updated_at", DESCENDING)]
+    )
+
+
+async def backfill_search_index(batch_size: int = 500) -> int:
+    """Index every hot record; entries are upserts, so a rerun is harmless."""
+    indexed = 0
+    for document_cls in ENTITY_TYPES:
+        batch: list[Document] = []
+        async for document in document_cls.find({}):
+            batch.append(document)
+            if len(batch) >= batch_size:
+                await index_documents(batch)
+                indexed += len(batch)
+                batch = []
+        if batch:
+            await index_documents(batch)
+            indexed += len(batch)
+    if indexed:
+        logger.info("Indexed %s records for search", indexed)
+    return indexed
+
+
+def _term_score(term: str) -> dict:
+    """4 exact title token, 3 title token prefix, 2 exact token, 1 token prefix."""
+    term = {"$literal": term}
+    title_tokens = {"$ifNull": ["$title_tokens", []]}
+    return {
+        "$switch": {
+            "branches": [
+                {"case": {"$in": [term, title_tokens]}, "then": 4},
+                {
+                    "case": {
+                        "$anyElementTrue": [
+                            {
+                                "$map": {
+                                    "input": title_tokens,
+                                    "as": "token",
+                                    "in": {"$eq": [{"$indexOfCP": ["$$token", term]}, 0]},
+                                }
+                            }
+                        ]
+                    },
+                    "then": 3,
+                },
+                {"case": {"$in": [term, {"$ifNull": ["$tokens", []]}]}, "then": 2},
+            ],
+            "default": 1,
+        }
+    }
+
+
+async def search_workspace(
+    workspace_id,
+    query: str,
+    *,
+    entity_types: Optional[list[str]] = None,
+    limit: int = 20,
+) -> list[dict]:
+    """Prefix-match every query term against the workspace's token index.
+
+    Every match is scored in the aggregation, so older exact matches outrank
+    newer partial ones.
+    """
+    terms = tokenize(query)[:8]
+    if not terms:
+        return []
+
+    filters: dict = {
+        "workspace_id": workspace_id,
+        "is_archived": False,
+        "$and": [{"tokens": {"$regex": f"^{re.escape(term)}"}} for term in terms],
+    }
+    if entity_types:
+        filters["entity_type"] = {"$in": entity_types}
+
+    pipeline = [
+        {"$match": filters},
+        {"$set": {"score": {"$add": [_term_score(term) for term in terms]}}},
+        {"$sort": {"score": DESCENDING, "updated_at": DESCENDING}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "entity_type": 1, "entity_id": 1, "title": 1, "subtitle": 1, "score": 1}},
+    ]
+    entries = await db[SEARCH_COLLECTION].aggregate(pipeline).to_list(length=limit)
+    return [
+        {
+            "type": entry["entity_type"],
+            "id": str(entry["entity_id"]),
+            "title": entry.get("title"),
+            "subtitle": entry.get("subtitle"),
+            "score": entry["score"],
+        }
+        for entry in entries
+    ]
@@ -0,0 +1,60 @@
+import hashlib
+from typing import Hashable, Iterable
+
+from fastapi import Request
+from pymongo import UpdateOne
+
+from app.core.cache import invalidate_workspace_data
+from app.core.database import db
+
+
+VERSIONS_COLLECTION = "collection_versions"
+
+
+def _version_key(collection: str, scope_id: Hashable) -> str:
+    return f"{collection}:{scope_id}"
+
+
+async def bump_collection_versions(collection: str, scope_ids: Iterable[Hashable]) -> None:
+    operations = [
+        UpdateOne(
+            {"_id": _version_key(collection, scope_id)},
+            {"$inc": {"version": 1}},
+            upsert=True,
+        )
+        for scope_id in {str(scope_id) for scope_id in scope_ids}
+    ]
+    if operations:
+        await db[VERSIONS_COLLECTION].bulk_write(operations, ordered=False)
+
+
+async def workspace_data_changed(collection: str, workspace_id: Hashable) -> None:
+    """Record a mutation: bump the collection version and drop dependent caches."""
+    await bump_collection_versions(collection, [workspace_id])
+    invalidate_workspace_data(collection, workspace_id)
+
+
+async def list_etag(request: Request, scope_id: Hashable, *collections: str) -> str:
+    """Weak ETag for a list response built from ``collections`` within a scope.
+
+    Only the version counters are read, so a matching ``If-None-Match`` can be
+    answered without running the list query.
+    """
+    keys = [_version_key(collection, scope_id) for collection in collections]
+    documents = await db[VERSIONS_COLLECTION].find({"_id": {"$in": keys}}).to_list(length=len(keys))
+    versions = {document["_id"]: document.get("version", 0) for document in documents}
+    fingerprint = "|".join(
+        [request.url.path, str(scope_id), str(request.url.query)]
+        + [f"{key}={versions.get(key, 0)}" for key in keys]
+    )
+    return f'W/"{hashlib.sha1(fingerprint.encode()).hexdigest()[:20]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
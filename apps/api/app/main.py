@@ -1,7 +1,9 @@
+import asyncio
 import os
 from asyncio import run
 from contextlib import asynccontextmanager
-from datetime import time
+from datetime import datetime, time
+from functools import partial
 
 import sentry_sdk
 from sentry_sdk.integrations.fastapi import FastApiIntegration
@@ -10,13 +12,30 @@ from prometheus_fastapi_instrumentator import Instrumentator
 from beanie import init_beanie
 from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request
 from fastapi.responses import JSONResponse
-from models.models import IncomeTransaction, Invoice, OTPActivationModel, PasswordResetToken, Person, User, Workspace, WorkspaceInvite, WorkspaceReactivationToken
+from models.models import AuditEvent, IncomeTransaction, Invoice, OTPActivationModel, PasswordResetToken, Person, RecurringInvoiceTemplate, User, Workspace, WorkspaceInvite, WorkspaceReactivationToken
 from fastapi.middleware.cors import CORSMiddleware
 
+from api.private.recurring_invoice import run_recurring_invoice_scheduler
 from api.router import router as api_router
+from app.core.archive import ensure_cold_indexes, run_archive_tiering_scheduler
+from app.core.audit import audit_log
 from app.core.config import config
 from app.core.database import db
 from app.core.email import send_email
+from app.core.health import readiness
+from app.core.invalidation_bus import invalidation_bus
+from app.core.indexes import prepare_ttl_indexes, verify_indexes
+from app.core.line_item_catalog import backfill_line_item_catalog, ensure_catalog_indexes
+from app.core.locks import run_once
+from app.core.metrics import start_metrics_tasks
+from app.core.migrations import (
+    backfill_archived_at,
+    backfill_income_fingerprints,
+    migrate_money_to_decimal,
+    normalize_workspace_members,
+)
+from app.core.profiling import profiling_middleware, start_stack_sampler
+from app.core.search import backfill_search_index, ensure_search_indexes
 from app.core.jwt import FastJWT
 
 
@@ -28,30 +47,76 @@ def init_sentry() -> None:
         dsn=config.SENTRY_DSN,
         environment=config.SENTRY_ENVIRONMENT or config.ENV,
         traces_sample_rate=config.SENTRY_TRACES_SAMPLE_RATE,
+        profiles_sample_rate=config.SENTRY_PROFILES_SAMPLE_RATE,
         integrations=[FastApiIntegration(), StarletteIntegration()],
         send_default_pii=False,
     )
 
 
+DOCUMENT_MODELS = [
+    User,
+    Workspace,
+    WorkspaceInvite,
+    OTPActivationModel,
+    PasswordResetToken,
+    WorkspaceReactivationToken,
+    Person,
+    IncomeTransaction,
+    Invoice,
+    RecurringInvoiceTemplate,
+    AuditEvent,
+]
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await prepare_ttl_indexes(DOCUMENT_MODELS)
     await init_beanie(
         database=db,
-        document_models=[
-            User,
-            Workspace,
-            WorkspaceInvite,
-            OTPActivationModel,
-            PasswordResetToken,
-            WorkspaceReactivationToken,
-            Person,
-            IncomeTransaction,
-            Invoice
-        ],
+        document_models=DOCUMENT_MODELS,
     )
+    await verify_indexes(DOCUMENT_MODELS)
+    await ensure_search_indexes()
+    await ensure_catalog_indexes()
+
+    if config.RUN_MIGRATIONS_ON_STARTUP:
+        await run_once("money_to_decimal", migrate_money_to_decimal)
+        await run_once("normalize_workspace_members", normalize_workspace_members)
+        await run_once("income_fingerprint_backfill", backfill_income_fingerprints)
+        await run_once("archived_at_backfill", backfill_archived_at)
+
+    audit_log.start()
+    stack_sampler = start_stack_sampler()
+    if config.CACHE_INVALIDATION_BUS_ENABLED:
+        await invalidation_bus.start()
+    background_tasks = start_metrics_tasks()
+    if config.RUN_MIGRATIONS_ON_STARTUP:
+        background_tasks.append(
+            asyncio.create_task(run_once("search_index_backfill", backfill_search_index))
+        )
+        background_tasks.append(
+            asyncio.create_task(
+                run_once(
+                    "line_item_catalog_backfill",
+                    partial(backfill_line_item_catalog, before=datetime.utcnow()),
+                )
+            )
+        )
+    if config.RECURRING_INVOICES_ENABLED:
+        background_tasks.append(asyncio.create_task(run_recurring_invoice_scheduler()))
+    if config.ARCHIVE_TIERING_ENABLED:
+        await ensure_cold_indexes()
+        background_tasks.append(asyncio.create_task(run_archive_tiering_scheduler()))
 
     yield
 
+    for task in background_tasks:
+        task.cancel()
+    invalidation_bus.stop()
+    await audit_log.stop()
+    if stack_sampler:
+        stack_sampler.stop()
+
 
 def get_application():
     init_sentry()
@@ -68,6 +133,9 @@ def get_application():
                 return JSONResponse(status_code=401, content={"detail": "Unauthorized"})
         return await call_next(request)
 
+    if config.PROFILING_TOKEN:
+        _app.middleware("http")(profiling_middleware)
+
     _app.add_middleware(
         CORSMiddleware,
         allow_origins=config.BACKEND_CORS_ORIGINS,
@@ -90,8 +158,16 @@ app = get_application()
 
 # health check
 @app.get("/health")
+@app.get("/health/live")
 async def health():
     return {"status": "ok"}
 
 
+@app.get("/health/ready")
+async def health_ready():
+    report = await readiness(DOCUMENT_MODELS)
+    status_code = 200 if report["status"] == "ready" else 503
+    return JSONResponse(status_code=status_code, content=report)
+
+
 app.include_router(api_router)
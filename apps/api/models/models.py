@@ -2,13 +2,48 @@
 from __future__ import annotations
 
 
-from datetime import datetime
+import hashlib
+from datetime import datetime, timezone
+from decimal import ROUND_HALF_UP, Decimal
 from enum import Enum
-from typing import List, Optional, Dict, Any
+from typing import Annotated, List, Optional, Dict, Any
 from uuid import uuid4
 
-from beanie import Document, Indexed, Link, PydanticObjectId
-from pydantic import BaseModel, EmailStr, Field, validator
+from beanie import Document, Indexed, Insert, Link, PydanticObjectId, Replace, Save, before_event
+from bson.decimal128 import Decimal128
+from pydantic import BaseModel, BeforeValidator, EmailStr, Field, PlainSerializer, validator
+from pymongo import ASCENDING, IndexModel
+
+
+CENT = Decimal("0.01")
+
+
+def to_decimal(value: Any) -> Decimal:
+    """Convert stored or submitted money values (Decimal128, float, int, str) to Decimal."""
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, Decimal128):
+        return value.to_decimal()
+    if value is None:
+        return Decimal(0)
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(value)
+
+
+def quantize_money(value: Any) -> Decimal:
+    return to_decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+# Stored as Decimal128 so sums are exact; still a plain JSON number on the API.
+Money = Annotated[
+    Decimal,
+    BeforeValidator(to_decimal),
+    PlainSerializer(float, return_type=float, when_used="json"),
+]
+
+
+WORKSPACE_INVITE_RETENTION_SECONDS = 30 * 86400
 
 
 class User(Document):
@@ -17,8 +52,14 @@ class User(Document):
     email_verified: bool = False
     full_name: Optional[str] = None
     notification_settings: "NotificationSettings" = Field(default_factory=lambda: NotificationSettings())
+    default_workspace_id: Optional[PydanticObjectId] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+    class Settings:
+        indexes = [
+            "email",
+        ]
+
 class NotificationSettings(BaseModel):
     email_on_signin: bool = False
     email_on_password_reset: bool = False
@@ -28,8 +69,19 @@ class Workspace(Document):
     owner: Link[User]
     members: List[Link[User]] = Field(default_factory=list)
     is_archived: bool = False
+    archived_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+    class Settings:
+        indexes = [
+            IndexModel([("members.$id", ASCENDING), ("is_archived", ASCENDING)]),
+            IndexModel([("owner.$id", ASCENDING), ("is_archived", ASCENDING)]),
+            IndexModel(
+                [("is_archived", ASCENDING), ("archived_at", ASCENDING)],
+                partialFilterExpression={"is_archived": True},
+            ),
+        ]
+
 class WorkspaceInvite(Document):
     workspace_id: PydanticObjectId
     email: EmailStr
@@ -45,11 +97,16 @@ class WorkspaceInvite(Document):
             "workspace_id",
             "email",
             "token",
+            IndexModel([("accepted_at", ASCENDING)], expireAfterSeconds=WORKSPACE_INVITE_RETENTION_SECONDS),
         ]
 
 class OTPActivationModel(Document):
     class Settings:
         name = "otp_activations"
+        indexes = [
+            "user_id",
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        ]
 
     user_id: PydanticObjectId
     otp: str
@@ -61,7 +118,7 @@ class PasswordResetToken(Document):
         indexes = [
             "token",
             "user_id",
-            "expires_at",
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
         ]
 
     user_id: PydanticObjectId
@@ -77,7 +134,7 @@ class WorkspaceReactivationToken(Document):
             "token",
             "workspace_id",
             "user_id",
-            "expires_at",
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
         ]
 
     workspace_id: PydanticObjectId
@@ -115,6 +172,7 @@ class Person(Document):
     note: Optional[str] = None
 
     is_archived: bool = False
+    archived_at: Optional[datetime] = None
 
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -124,6 +182,11 @@ class Person(Document):
             "workspace_id",
             "email",
             "billing_email",
+            IndexModel([("workspace_id", ASCENDING), ("expense_tags", ASCENDING)]),
+            IndexModel(
+                [("is_archived", ASCENDING), ("archived_at", ASCENDING)],
+                partialFilterExpression={"is_archived": True},
+            ),
         ]
 
 
@@ -138,12 +201,33 @@ class IncomeStatus(str, Enum):
     planned = "planned"
 
 
+def income_fingerprint(
+    workspace_id: PydanticObjectId,
+    person_id: PydanticObjectId,
+    amount: Decimal | float,
+    currency: str,
+    received_at: datetime,
+    reference: Optional[str],
+) -> str:
+    if received_at.tzinfo is not None:
+        received_at = received_at.astimezone(timezone.utc)
+    parts = [
+        str(workspace_id),
+        str(person_id),
+        f"{quantize_money(amount)}",
+        (currency or "").upper(),
+        received_at.date().isoformat(),
+        (reference or "").strip().lower(),
+    ]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
 class IncomeTransaction(Document):
     workspace_id: PydanticObjectId
     person_id: PydanticObjectId
     invoice_id: Optional[PydanticObjectId] = None
 
-    amount: float
+    amount: Money
     currency: str = "GBP"
     source_type: IncomeSourceType
     reference: Optional[str] = None
@@ -155,10 +239,26 @@ class IncomeTransaction(Document):
 
     is_reconciled: bool = False
     is_archived: bool = False
+    archived_at: Optional[datetime] = None
+    fingerprint: Optional[str] = None
 
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+    def compute_fingerprint(self) -> str:
+        return income_fingerprint(
+            self.workspace_id,
+            self.person_id,
+            self.amount,
+            self.currency,
+            self.received_at,
+            self.reference,
+        )
+
+    @before_event(Insert, Replace, Save)
+    def set_fingerprint(self):
+        self.fingerprint = self.compute_fingerprint()
+
     class Settings:
         name = "income_transactions"
         indexes = [
@@ -166,6 +266,13 @@ class IncomeTransaction(Document):
             "person_id",
             "received_at",
             "invoice_id",
+            IndexModel([("workspace_id", ASCENDING), ("person_id", ASCENDING), ("received_at", ASCENDING)]),
+            IndexModel([("workspace_id", ASCENDING), ("fingerprint", ASCENDING)]),
+            IndexModel([("workspace_id", ASCENDING), ("tags", ASCENDING), ("received_at", ASCENDING)]),
+            IndexModel(
+                [("is_archived", ASCENDING), ("archived_at", ASCENDING)],
+                partialFilterExpression={"is_archived": True},
+            ),
         ]
 
 
@@ -179,8 +286,8 @@ class InvoiceStatus(str, Enum):
 class InvoiceLineItem(BaseModel):
     description: str
     quantity: float
-    unit_price: float
-    total: float
+    unit_price: Money
+    total: Money
 
 
 class Invoice(Document):
@@ -200,12 +307,17 @@ class Invoice(Document):
     payment_details: Optional[str] = None
 
     tax_rate: float = 0.0
-    subtotal: float = 0.0
-    tax_amount: float = 0.0
-    total: float = 0.0
+    subtotal: Money = Decimal(0)
+    tax_amount: Money = Decimal(0)
+    total: Money = Decimal(0)
 
     is_public: bool = False
     is_archived: bool = False
+    archived_at: Optional[datetime] = None
+
+    # Set on invoices generated from a recurring template; unique per run.
+    recurring_template_id: Optional[PydanticObjectId] = None
+    recurring_run_at: Optional[datetime] = None
 
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -219,4 +331,85 @@ class Invoice(Document):
             "issue_date",
             "due_date",
             "public_id",
+            IndexModel([("workspace_id", ASCENDING), ("person_id", ASCENDING), ("status", ASCENDING)]),
+            IndexModel([("workspace_id", ASCENDING), ("status", ASCENDING), ("due_date", ASCENDING)]),
+            IndexModel(
+                [("recurring_template_id", ASCENDING), ("recurring_run_at", ASCENDING)],
+                unique=True,
+                partialFilterExpression={"recurring_template_id": {"$type": "objectId"}},
+            ),
+            IndexModel(
+                [("is_archived", ASCENDING), ("archived_at", ASCENDING)],
+                partialFilterExpression={"is_archived": True},
+            ),
+        ]
+
+
+class RecurrenceFrequency(str, Enum):
+    weekly = "weekly"
+    monthly = "monthly"
+    custom = "custom"
+
+
+class RecurringInvoiceTemplate(Document):
+    workspace_id: PydanticObjectId
+    person_id: PydanticObjectId
+
+    name: Optional[str] = None
+    frequency: RecurrenceFrequency = RecurrenceFrequency.monthly
+    interval: int = 1
+    start_date: datetime
+    end_date: Optional[datetime] = None
+    next_run_at: datetime
+    last_run_at: Optional[datetime] = None
+    due_in_days: int = 30
+
+    currency: str = "GBP"
+    items: List[InvoiceLineItem] = Field(default_factory=list)
+    notes: Optional[str] = None
+    payment_details: Optional[str] = None
+
+    tax_rate: float = 0.0
+    subtotal: Money = Decimal(0)
+    tax_amount: Money = Decimal(0)
+    total: Money = Decimal(0)
+
+    status: InvoiceStatus = InvoiceStatus.issued
+    is_public: bool = False
+    send_email: bool = False
+
+    is_active: bool = True
+    is_archived: bool = False
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "recurring_invoice_templates"
+        indexes = [
+            "workspace_id",
+            IndexModel([("is_active", ASCENDING), ("is_archived", ASCENDING), ("next_run_at", ASCENDING)]),
+        ]
+
+
+class AuditAction(str, Enum):
+    create = "create"
+    update = "update"
+    archive = "archive"
+    reactivate = "reactivate"
+
+
+class AuditEvent(Document):
+    workspace_id: PydanticObjectId
+    entity_type: str
+    entity_id: PydanticObjectId
+    action: AuditAction
+    actor_id: Optional[PydanticObjectId] = None
+    changes: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    ts: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "audit_events"
+        indexes = [
+            IndexModel([("workspace_id", ASCENDING), ("entity_id", ASCENDING), ("ts", ASCENDING)]),
         ]
@@ -0,0 +1,41 @@
+import os
+
+for key, value in {
+    "PROJECT_NAME": "creda-test",
+    "DATABASE_NAME": "creda_test",
+    "DATABASE_URL": "mongodb://localhost:27017",
+    "API_BASE_URL": "http://testserver",
+    "JWT_SECRET_KEY": "test",
+    "PASSWORDS_SALT_SECRET_KEY": "test",
+}.items():
+    os.environ.setdefault(key, value)
+
+import motor.motor_asyncio
+import mongomock.collection
+import pytest_asyncio
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+
+# pymongo >= 4.11 passes ``sort`` to bulk update builders; mongomock 4.3 does
+# not accept it yet. The app never sorts inside bulk updates, so drop it.
+_add_update = mongomock.collection.BulkOperationBuilder.add_update
+
+
+def _add_update_without_sort(self, *args, sort=None, **kwargs):
+    return _add_update(self, *args, **kwargs)
+
+
+mongomock.collection.BulkOperationBuilder.add_update = _add_update_without_sort
+
+# Route the app's shared client to mongomock before any app module imports it.
+motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+
+from app.core.database import client, db  # noqa: E402
+from models.models import User, Workspace, WorkspaceInvite  # noqa: E402
+
+
+@pytest_asyncio.fixture
+async def mock_db():
+    await client.drop_database(db.name)
+    await init_beanie(database=db, document_models=[User, Workspace, WorkspaceInvite])
+    return db
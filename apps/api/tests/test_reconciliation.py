@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+from beanie import PydanticObjectId
+
+from api.private.reconciliation import Candidate, _match_lines, _parse_statement, _reference_key
+
+
+def _invoice(number: str, amount_cents: int = 150000) -> Candidate:
+    return Candidate(
+        kind="invoice",
+        id=PydanticObjectId(),
+        date=datetime(2026, 1, 31),
+        amount_cents=amount_cents,
+        person_id=PydanticObjectId(),
+        currency="GBP",
+        reference_key=_reference_key(number),
+        number=number,
+    )
+
+
+def _statement(*rows: str) -> bytes:
+    return "\n".join(("date,amount,reference", *rows)).encode()
+
+
+def test_same_amount_invoices_are_told_apart_by_number():
+    first, second = _invoice("INV-0001"), _invoice("INV-0002")
+    lines = _parse_statement(
+        _statement(
+            "2026-02-03,1500.00,Payment INV-0002 thank you",
+            "2026-02-04,1500.00,inv 0001 transfer",
+            "2026-02-05,1500.00,Payment transfer",
+        ),
+        "GBP",
+    )
+
+    confident, ambiguous, unmatched = _match_lines(lines, [], [first, second], timedelta(days=3))
+
+    assert [(line.line, candidate.number) for line, candidate in confident] == [
+        (2, "INV-0002"),
+        (3, "INV-0001"),
+    ]
+    assert ambiguous == [] and [line["line"] for line in unmatched] == [4]
+
+
+def test_generic_words_do_not_match_references():
+    lines = _parse_statement(_statement("2026-02-03,99.00,INV payment"), "GBP")
+
+    confident, ambiguous, unmatched = _match_lines(
+        lines, [], [_invoice("INV-0001", 9900), _invoice("INV-0002", 9900)], timedelta(days=3)
+    )
+
+    assert confident == [] and len(ambiguous[0]["candidates"]) == 2 and unmatched == []
@@ -0,0 +1,88 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from api.private.workspace import (
+    _member_ids,
+    _member_ref,
+    accept_workspace_invite,
+    leave_workspace,
+    remove_workspace_member,
+)
+from app.core.migrations import normalize_workspace_members
+from app.core.versions import VERSIONS_COLLECTION, _version_key
+from models.models import User, Workspace, WorkspaceInvite
+
+
+async def _user(email: str) -> User:
+    return await User(email=email, password="x").insert()
+
+
+async def _invite(workspace: Workspace, owner: User, user: User) -> str:
+    token = uuid4().hex
+    await WorkspaceInvite(
+        workspace_id=workspace.id,
+        email=user.email,
+        invited_by=owner.id,
+        token=token,
+    ).insert()
+    return token
+
+
+@pytest.mark.asyncio
+async def test_concurrent_membership_changes_are_not_lost(mock_db):
+    owner = await _user("owner@example.com")
+    leaving = await _user("leaving@example.com")
+    removed = await _user("removed@example.com")
+    workspace = await Workspace(
+        name="Acme",
+        owner=_member_ref(owner.id),
+        members=[_member_ref(owner.id), _member_ref(leaving.id), _member_ref(removed.id)],
+    ).insert()
+
+    joining = [await _user(f"member{index}@example.com") for index in range(10)]
+    tokens = [await _invite(workspace, owner, user) for user in joining]
+
+    await asyncio.gather(
+        *(accept_workspace_invite(token, user) for token, user in zip(tokens, joining)),
+        remove_workspace_member(workspace.id, removed.id, owner),
+        leave_workspace(workspace.id, leaving),
+    )
+
+    workspace = await Workspace.get(workspace.id)
+    assert set(_member_ids(workspace)) == {str(owner.id), *(str(user.id) for user in joining)}
+
+
+@pytest.mark.asyncio
+async def test_legacy_member_shapes_can_be_removed_after_normalizing(mock_db):
+    owner = await _user("owner@example.com")
+    legacy = await _user("legacy@example.com")
+    workspace = await Workspace(name="Acme", owner=_member_ref(owner.id)).insert()
+    await mock_db[Workspace.get_collection_name()].update_one(
+        {"_id": workspace.id},
+        {"$set": {"members": [_member_ref(owner.id), str(legacy.id), {"_id": legacy.id}]}},
+    )
+
+    await normalize_workspace_members()
+    await remove_workspace_member(workspace.id, legacy.id, owner)
+
+    workspace = await Workspace.get(workspace.id)
+    assert _member_ids(workspace) == [str(owner.id)]
+
+
+@pytest.mark.asyncio
+async def test_membership_changes_bump_the_owner_list_version(mock_db):
+    owner = await _user("owner@example.com")
+    leaving = await _user("leaving@example.com")
+    # The owner is not listed in ``members`` on every workspace.
+    workspace = await Workspace(
+        name="Acme", owner=_member_ref(owner.id), members=[_member_ref(leaving.id)]
+    ).insert()
+
+    await leave_workspace(workspace.id, leaving)
+
+    version = await mock_db[VERSIONS_COLLECTION].find_one(
+        {"_id": _version_key(Workspace.get_collection_name(), owner.id)}
+    )
+    assert version and version["version"] == 1
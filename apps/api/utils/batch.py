@@ -0,0 +1,43 @@
+from typing import List, Optional, Type
+
+from beanie import Document, PydanticObjectId
+from pydantic import BaseModel, Field
+
+from utils.fieldsets import parse_fields, sparse_model
+
+
+MAX_BATCH_IDS = 100
+
+
+class BatchGetRequest(BaseModel):
+    ids: List[PydanticObjectId] = Field(min_length=1, max_length=MAX_BATCH_IDS)
+    fields: Optional[str] = None
+    include_archived: bool = False
+
+
+async def batch_get(
+    document_cls: Type[Document],
+    workspace_id: PydanticObjectId,
+    payload: BatchGetRequest,
+    allowed_fields: tuple[str, ...],
+) -> dict:
+    """Fetch ``payload.ids`` from one workspace with a single ``$in`` query.
+
+    Found documents keep the requested order; unknown or inaccessible IDs are
+    listed under ``missing``.
+    """
+    fieldset = parse_fields(payload.fields, allowed_fields)
+    ids = list(dict.fromkeys(payload.ids))
+    filters = {"_id": {"$in": ids}, "workspace_id": workspace_id}
+    if not payload.include_archived:
+        filters["is_archived"] = False
+
+    query = document_cls.find(filters)
+    if fieldset:
+        query = query.project(sparse_model(document_cls, fieldset))
+    documents = {document.id: document for document in await query.to_list()}
+
+    return {
+        "items": [documents[document_id] for document_id in ids if document_id in documents],
+        "missing": [str(document_id) for document_id in ids if document_id not in documents],
+    }
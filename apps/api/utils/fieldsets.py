@@ -0,0 +1,46 @@
+from functools import lru_cache
+from typing import Iterable, Optional, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, Field, create_model
+
+
+def document_fields(model: Type[BaseModel], exclude: Iterable[str] = ()) -> tuple[str, ...]:
+    excluded = {"revision_id", *exclude}
+    return tuple(name for name in model.model_fields if name not in excluded)
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[tuple[str, ...]]:
+    """Validate a comma separated ``fields=`` value against ``allowed``.
+
+    Returns ``None`` when no fieldset was requested. ``id`` is always included.
+    """
+    if not fields:
+        return None
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(["id", *requested]))
+
+
+@lru_cache(maxsize=256)
+def sparse_model(model: Type[BaseModel], fields: tuple[str, ...]) -> Type[BaseModel]:
+    """Build a response model holding only ``fields`` of ``model``.
+
+    The model carries the matching Mongo projection in ``Settings`` so it can
+    be passed straight to Beanie's ``project()``.
+    """
+    definitions = {}
+    for name in fields:
+        field = model.model_fields[name]
+        annotation = Optional[field.rebuild_annotation()]
+        if name == "id":
+            definitions[name] = (annotation, Field(None, validation_alias="_id"))
+        else:
+            definitions[name] = (annotation, None)
+
+    sparse = create_model(f"{model.__name__}Fields", **definitions)
+    projection = {"_id": 1, **{name: 1 for name in fields if name != "id"}}
+    sparse.Settings = type("Settings", (), {"projection": projection})
+    return sparse
@@ -1,7 +1,7 @@
 
 from beanie import PydanticObjectId
 from bson.dbref import DBRef
-from fastapi import Depends, HTTPException, Header, Path, APIRouter, Cookie
+from fastapi import Depends, HTTPException, Header, Path, APIRouter, Cookie, Request
 from app.core.jwt import FastJWT
 from models.models import User, Workspace
 
@@ -51,13 +51,42 @@ def _member_ids(workspace: Workspace) -> set[str]:
             ids.add(member_id)
     return ids
 
+def workspace_membership_filter(user_id: PydanticObjectId) -> dict:
+    return {
+        "is_archived": {"$ne": True},
+        "$or": [
+            {"members.$id": PydanticObjectId(user_id)},
+            {"owner.$id": PydanticObjectId(user_id)},
+        ],
+    }
+
+
+async def find_default_workspace(user: User) -> Workspace | None:
+    if user.default_workspace_id:
+        workspace = await Workspace.find_one(
+            {"_id": user.default_workspace_id, **workspace_membership_filter(user.id)}
+        )
+        if workspace:
+            return workspace
+    return await Workspace.find_one(workspace_membership_filter(user.id))
+
+
 async def get_current_workspace(
+    request: Request,
     user: User = Depends(FastJWT().login_required),
     workspace_id: str | None = Header(None, alias="X-Workspace-ID"),
     workspace_cookie: str | None = Cookie(None, alias="X-Workspace-ID"),
 ):
+    # Sub-requests of /private/batch reuse the workspace resolved for the batch.
+    batch_workspace = getattr(request.state, "batch_workspace", None)
+    if batch_workspace is not None:
+        return batch_workspace
+    batch_error = getattr(request.state, "batch_workspace_error", None)
+    if batch_error is not None:
+        raise HTTPException(status_code=batch_error.status_code, detail=batch_error.detail)
+
     workspace_lookup = workspace_id or workspace_cookie
-    if workspace_lookup:
+    if workspace_lookup and PydanticObjectId.is_valid(workspace_lookup):
         workspace = await Workspace.find_one(
             {"_id": PydanticObjectId(workspace_lookup), "is_archived": {"$ne": True}}
         )
@@ -66,13 +95,7 @@ async def get_current_workspace(
             if str(user.id) in _member_ids(workspace) or owner_id == str(user.id):
                 return workspace
 
-    workspace = None
-    for item in await Workspace.find({"is_archived": {"$ne": True}}).to_list():
-        owner_id = _owner_id(item)
-        if str(user.id) in _member_ids(item) or owner_id == str(user.id):
-            workspace = item
-            break
-
+    workspace = await find_default_workspace(user)
     if not workspace:
         raise HTTPException(
             status_code=403,